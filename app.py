@@ -1,6 +1,9 @@
 from flask import Flask
 from flask_cors import CORS
-from config import HEADERS
+from config import HEADERS, JSON_PROVIDER
+from json_provider import get_json_provider_class
+from compression import init_compression
+from instrumentation import init_instrumentation
 from routes.buy_stock import buy_stock_bp
 from routes.sell_stock import sell_stock_bp
 from routes.get_portfolio_history import get_portfolio_history_bp
@@ -14,9 +17,15 @@ from routes.get_cash_balance import get_cash_balance_bp
 from routes.get_invesment_chart_data import get_investment_chart_data_bp
 from routes.watchlist import watchlist_bp
 from routes.get_stock_price import stock_price_bp
+from routes.price_stream import price_stream_bp
+from routes.dashboard import dashboard_bp
+from routes.metrics import metrics_bp
 
 app = Flask(__name__)
+app.json = get_json_provider_class(JSON_PROVIDER)(app)
 CORS(app)
+init_compression(app)
+init_instrumentation(app)
 
 # Register blueprints
 app.register_blueprint(get_cash_balance_bp)
@@ -32,6 +41,9 @@ app.register_blueprint(get_historical_data_bp)
 app.register_blueprint(get_investment_chart_data_bp)
 app.register_blueprint(watchlist_bp)
 app.register_blueprint(stock_price_bp)
+app.register_blueprint(price_stream_bp)
+app.register_blueprint(dashboard_bp)
+app.register_blueprint(metrics_bp)
 
 if __name__ == '__main__':
     app.run(debug=True)
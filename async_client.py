@@ -0,0 +1,57 @@
+# async_client.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import supabase_client
+import quote_cache
+from config import SUPABASE_POOL_SIZE
+from instrumentation import bind
+
+# The coroutines run the pooled, retrying sync client on a bounded executor, so concurrent
+# requests share the same keep-alive connections instead of opening new ones.
+_executor = ThreadPoolExecutor(max_workers=SUPABASE_POOL_SIZE, thread_name_prefix="async-client")
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, bind(func, *args))
+
+async def async_call(func, *args):
+    """
+    Await any other blocking call (e.g. a position book lookup) on the same executor.
+    """
+    return await _run(func, *args)
+
+async def async_get_from_supabase(endpoint, params=None):
+    return await _run(supabase_client.get_from_supabase, endpoint, params)
+
+async def async_post_to_supabase(endpoint, data):
+    return await _run(supabase_client.post_to_supabase, endpoint, data)
+
+async def async_patch_to_supabase(endpoint, data):
+    return await _run(supabase_client.patch_to_supabase, endpoint, data)
+
+async def async_delete_from_supabase(endpoint, params=None):
+    return await _run(supabase_client.delete_from_supabase, endpoint, params)
+
+async def async_get_price(symbol):
+    return await _run(quote_cache.get_price, symbol)
+
+async def async_get_prices(stock_symbols):
+    return await _run(quote_cache.get_prices, stock_symbols)
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous (Flask) code.
+    """
+    return asyncio.run(coro)
+
+def run_concurrently(*coros):
+    """
+    Await independent requests together and return their results in the given order,
+    e.g. portfolio_response, transactions_response = run_concurrently(async_get_from_supabase(...), ...)
+    """
+    async def gather():
+        return await asyncio.gather(*coros)
+
+    return run_sync(gather())
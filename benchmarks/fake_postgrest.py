@@ -0,0 +1,459 @@
+# benchmarks/fake_postgrest.py
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+# Primary key and the columns looked up with eq. filters (kept in hash indexes) of every table
+TABLES = {
+    'portfolios': ('portfolio_id', ('portfolio_id', 'user_id')),
+    'portfolio_stocks': ('id', ('portfolio_id',)),
+    'trades': ('trade_id', ('portfolio_id',)),
+    'transactions': ('transaction_id', ('user_id',)),
+    'portfolio_returns': ('return_id', ('portfolio_id',)),
+    'watchlists': ('watchlist_id', ('user_id',)),
+    'watchlist_stocks': ('id', ('watchlist_id',)),
+    'user_ledger_totals': ('user_id', ('user_id',)),
+}
+
+DEFAULTS = {
+    'portfolios': {'cash_balance': 0.0, 'total_value': 0.0},
+    'portfolio_stocks': {'quantity': 0.0, 'total_investment': 0.0, 'average_price': None},
+    'watchlists': {'watchlist_name': 'Default Watchlist'},
+}
+
+# Postgres functions of sql/ served under /rest/v1/rpc/<name>, implemented as FakePostgrest methods
+FUNCTIONS = ('execute_trade', 'update_portfolio_values')
+
+
+class QueryError(Exception):
+    pass
+
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        self.key, self.indexed = TABLES[name]
+        self.rows = {}  # primary key -> row
+        self.version = 0  # bumped on every write, invalidates cached query results
+        self.indexes = {column: defaultdict(dict) for column in self.indexed}  # column -> value -> {key: row}
+
+    def insert(self, row):
+        row = dict(DEFAULTS.get(self.name, {}), **row)
+        row.setdefault(self.key, str(uuid.uuid4()))
+        if 'created_at' not in row and self.name in ('portfolio_returns', 'trades', 'portfolios'):
+            row['created_at'] = datetime.utcnow().isoformat()
+        self.rows[row[self.key]] = row
+        for column, index in self.indexes.items():
+            index[row.get(column)][row[self.key]] = row
+        self.version += 1
+        return row
+
+    def update(self, row, changes):
+        for column, index in self.indexes.items():
+            if column in changes and changes[column] != row.get(column):
+                index[row.get(column)].pop(row[self.key], None)
+                index[changes[column]][row[self.key]] = row
+        row.update(changes)
+        self.version += 1
+
+    def delete(self, row):
+        self.rows.pop(row[self.key], None)
+        for column, index in self.indexes.items():
+            index[row.get(column)].pop(row[self.key], None)
+        self.version += 1
+
+    def find(self, filters):
+        """
+        Rows matching every (column, operator, value) filter; an eq filter on an indexed column
+        narrows the scan to that index bucket.
+        """
+        candidates = None
+        for column, operator, value in filters:
+            if operator == 'eq' and column in self.indexes:
+                bucket = self.indexes[column].get(value) or self.indexes[column].get(_number(value)) or {}
+                candidates = list(bucket.values())
+                break
+        if candidates is None:
+            candidates = list(self.rows.values())
+        return [row for row in candidates if all(_matches(row.get(column), operator, value)
+                                                 for column, operator, value in filters)]
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _coerce(current, value):
+    if isinstance(current, bool):
+        return value == 'true'
+    if isinstance(current, (int, float)):
+        return float(value)
+    return value
+
+
+def _matches(current, operator, value):
+    if operator == 'is':
+        return current is None if value == 'null' else current == (value == 'true')
+    if operator == 'in':
+        options = [option.strip().strip('"') for option in value.strip('()').split(',')]
+        return current is not None and (str(current) in options or _number(current) in map(_number, options))
+    if current is None:
+        return operator == 'neq'
+    value = _coerce(current, value)
+    if operator == 'eq':
+        return current == value
+    if operator == 'neq':
+        return current != value
+    if operator == 'gt':
+        return current > value
+    if operator == 'gte':
+        return current >= value
+    if operator == 'lt':
+        return current < value
+    if operator == 'lte':
+        return current <= value
+    raise QueryError(f"Unsupported operator {operator}")
+
+
+class FakePostgrest:
+    """
+    In-memory stand-in for the Supabase REST (PostgREST) and auth endpoints the app uses: filtered,
+    ordered and paginated reads with column projection, inserts and merge-duplicates upserts,
+    PATCH/DELETE with filters, the execute_trade RPC and the user_ledger_totals trigger, plus
+    password login and signup. Every request waits `latency` seconds (plus up to `jitter`) first.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.tables = {name: Table(name) for name in TABLES}
+        self.users = {}  # email -> {'id', 'email', 'password'}
+        self.lock = threading.RLock()
+        self.stats = defaultdict(lambda: {'count': 0, 'seconds': 0.0})
+        self.query_cache = {}  # (table, filters, order) -> (table version, rows)
+        self.server = None
+        self.thread = None
+
+    # Data
+
+    def reset(self):
+        with self.lock:
+            self.tables = {name: Table(name) for name in TABLES}
+            self.users = {}
+            self.stats.clear()
+            self.query_cache.clear()
+
+    def add_user(self, email, password, user_id=None):
+        user = {'id': user_id or str(uuid.uuid4()), 'email': email, 'password': password}
+        self.users[email] = user
+        return user
+
+    def insert(self, table, row):
+        with self.lock:
+            row = self.tables[table].insert(row)
+            if table == 'transactions':
+                self._record_ledger(row)
+            return row
+
+    def _record_ledger(self, transaction):
+        # Mirrors the trigger of sql/user_ledger_totals.sql
+        if transaction.get('transaction_type') not in ('DEPOSIT', 'WITHDRAWAL'):
+            return
+        ledger = self.tables['user_ledger_totals']
+        totals = ledger.rows.get(transaction['user_id'])
+        if totals is None:
+            totals = ledger.insert({'user_id': transaction['user_id'], 'total_deposits': 0.0,
+                                    'total_withdrawals': 0.0, 'last_transaction_date': None})
+        column = 'total_deposits' if transaction['transaction_type'] == 'DEPOSIT' else 'total_withdrawals'
+        dates = [date for date in (totals['last_transaction_date'], transaction.get('transaction_date')) if date]
+        ledger.update(totals, {column: totals[column] + float(transaction.get('amount') or 0),
+                               'last_transaction_date': max(dates) if dates else None})
+
+    # Queries
+
+    def select(self, table, query):
+        filters = []
+        columns = None
+        order = []
+        limit = offset = None
+        for name, value in query:
+            if name == 'select':
+                if value != '*':
+                    columns = [column.strip() for column in value.split(',')]
+                    if any(not column.replace('_', '').isalnum() for column in columns):
+                        raise QueryError(f"Unsupported select {value}")
+            elif name == 'order':
+                for term in value.split(','):
+                    column, _, direction = term.partition('.')
+                    order.append((column, direction.startswith('desc')))
+            elif name == 'limit':
+                limit = int(value)
+            elif name == 'offset':
+                offset = int(value)
+            elif name != 'on_conflict':
+                operator, _, operand = value.partition('.')
+                filters.append((name, operator, operand))
+
+        with self.lock:
+            target = self.tables[table]
+            # Paginated scans repeat the same filtered, ordered query page after page
+            signature = (table, tuple(filters), tuple(order))
+            cached = self.query_cache.get(signature)
+            if cached is not None and cached[0] == target.version:
+                rows = cached[1]
+            else:
+                rows = target.find(filters)
+                for column, descending in reversed(order):
+                    rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=descending)
+                if limit is not None or offset is not None:
+                    self.query_cache[signature] = (target.version, rows)
+            rows = rows[offset or 0:(offset or 0) + limit if limit is not None else None]
+            if columns is None:
+                return [dict(row) for row in rows]
+            return [{column: row.get(column) for column in columns} for row in rows]
+
+    def write(self, table, body, prefer, query):
+        rows = body if isinstance(body, list) else [body]
+        on_conflict = dict(query).get('on_conflict')
+        merge = 'resolution=merge-duplicates' in prefer
+        written = []
+        with self.lock:
+            target = self.tables[table]
+            for row in rows:
+                existing = None
+                if merge:
+                    key = on_conflict or target.key
+                    matches = target.find([(key, 'eq', str(row.get(key)))]) if row.get(key) is not None else []
+                    existing = matches[0] if matches else None
+                if existing is not None:
+                    target.update(existing, row)
+                    written.append(existing)
+                else:
+                    written.append(self.insert(table, row))
+        return written if isinstance(body, list) else written[0]
+
+    def patch(self, table, body, query):
+        with self.lock:
+            rows = self.tables[table].find(self._filters(query))
+            for row in rows:
+                self.tables[table].update(row, body)
+            return rows
+
+    def remove(self, table, query):
+        with self.lock:
+            rows = self.tables[table].find(self._filters(query))
+            for row in rows:
+                self.tables[table].delete(row)
+            return rows
+
+    @staticmethod
+    def _filters(query):
+        return [(name, *value.partition('.')[::2]) for name, value in query
+                if name not in ('select', 'order', 'limit', 'offset', 'on_conflict')]
+
+    def update_portfolio_values(self, p_portfolio_ids, p_total_values):
+        """
+        sql/update_portfolio_values.sql: set total_value of the existing portfolios only.
+        """
+        with self.lock:
+            portfolios = self.tables['portfolios']
+            updated = 0
+            for portfolio_id, total_value in zip(p_portfolio_ids, p_total_values):
+                portfolio = portfolios.rows.get(portfolio_id)
+                if portfolio is not None:
+                    portfolios.update(portfolio, {'total_value': total_value})
+                    updated += 1
+            return updated
+
+    def execute_trade(self, p_portfolio_id, p_stock_symbol, p_trade_type, p_amount, p_price):
+        """
+        Same rules as sql/execute_trade.sql; raises QueryError with the error code.
+        """
+        if not p_amount or p_amount <= 0 or not p_price or p_price <= 0 or p_trade_type not in ('BUY', 'SELL'):
+            raise QueryError('INVALID_ORDER')
+
+        with self.lock:
+            portfolio = self.tables['portfolios'].rows.get(p_portfolio_id)
+            if portfolio is None:
+                raise QueryError('PORTFOLIO_NOT_FOUND')
+
+            quantity = p_amount / p_price
+            holdings = self.tables['portfolio_stocks'].find([('portfolio_id', 'eq', p_portfolio_id),
+                                                             ('stock_symbol', 'eq', p_stock_symbol)])
+            holding = holdings[0] if holdings else None
+
+            holdings_table = self.tables['portfolio_stocks']
+            if p_trade_type == 'BUY':
+                if portfolio['cash_balance'] < p_amount:
+                    raise QueryError('INSUFFICIENT_FUNDS')
+                if holding is not None:
+                    total_investment = holding['total_investment'] + p_amount
+                    holdings_table.update(holding, {
+                        'quantity': holding['quantity'] + quantity,
+                        'total_investment': total_investment,
+                        'average_price': total_investment / (holding['quantity'] + quantity)
+                    })
+                else:
+                    holding = self.insert('portfolio_stocks', {
+                        'portfolio_id': p_portfolio_id, 'stock_symbol': p_stock_symbol, 'quantity': quantity,
+                        'total_investment': p_amount, 'average_price': p_price
+                    })
+                cash_balance = portfolio['cash_balance'] - p_amount
+            else:
+                if holding is None:
+                    raise QueryError('STOCK_NOT_IN_PORTFOLIO')
+                if holding['quantity'] * p_price < p_amount:
+                    raise QueryError('INSUFFICIENT_SHARES')
+                remaining = max(holding['quantity'] - quantity, 0)
+                holdings_table.update(holding, {'quantity': remaining,
+                                                'total_investment': remaining * holding['average_price']})
+                cash_balance = portfolio['cash_balance'] + p_amount
+            self.tables['portfolios'].update(portfolio, {'cash_balance': cash_balance})
+
+            self.insert('trades', {'portfolio_id': p_portfolio_id, 'stock_symbol': p_stock_symbol,
+                                   'trade_type': p_trade_type, 'quantity': quantity, 'price': p_price})
+            return {
+                'quantity': quantity,
+                'new_cash_balance': portfolio['cash_balance'],
+                'new_quantity': holding['quantity'],
+                'average_price': holding['average_price']
+            }
+
+    # Server
+
+    def start(self, host='127.0.0.1', port=0):
+        self.server = ThreadingHTTPServer((host, port), _handler(self))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-postgrest', daemon=True)
+        self.thread.start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.stats[key]['count'] += 1
+            self.stats[key]['seconds'] += seconds
+
+
+def _handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without TCP_NODELAY every keep-alive
+        # response would wait for the client's delayed ACK (~40 ms)
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, payload=None):
+            # Only prepared here; _handle sends it once the call has been recorded
+            self.response = (status, payload)
+
+        def _send(self, status, payload):
+            body = b'' if payload is None else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def _handle(self, method):
+            started = time.perf_counter()
+            url = urlsplit(self.path)
+            query = parse_qsl(url.query, keep_blank_values=True)
+            body = self._body() if method in ('POST', 'PATCH') else None
+            parts = url.path.strip('/').split('/')
+            key = f"{method} {'/'.join(parts[2:]) or url.path}"
+
+            if backend.latency or backend.jitter:
+                time.sleep(backend.latency + backend.random.uniform(0, backend.jitter))
+
+            self.response = (500, {'message': 'No response'})
+            try:
+                self._dispatch(method, parts, query, body)
+            except QueryError as e:
+                self._reply(400, {'code': 'P0001', 'message': str(e)})
+            except KeyError as e:
+                self._reply(404, {'message': f"Unknown relation {e}"})
+            finally:
+                # Counted before the client gets the response, so a report taken right after the
+                # last request includes it
+                backend.record(key, time.perf_counter() - started)
+                self._send(*self.response)
+
+        def _dispatch(self, method, parts, query, body):
+            if parts[:2] == ['auth', 'v1']:
+                return self._auth(parts[2], body)
+
+            if parts[:2] != ['rest', 'v1'] or len(parts) < 3:
+                return self._reply(404, {'message': 'Not found'})
+
+            if parts[2] == 'rpc':
+                function = getattr(backend, parts[3]) if parts[3:] and parts[3] in FUNCTIONS else None
+                if function is None:
+                    return self._reply(404, {'message': 'Unknown function'})
+                return self._reply(200, function(**body))
+
+            table = parts[2]
+            if table not in backend.tables:
+                raise KeyError(table)
+
+            if method == 'GET':
+                return self._reply(200, backend.select(table, query))
+            if method == 'POST':
+                written = backend.write(table, body, self.headers.get('Prefer', ''), query)
+                minimal = 'return=minimal' in self.headers.get('Prefer', '')
+                return self._reply(201, None if minimal else written)
+            if method == 'PATCH':
+                backend.patch(table, body, query)
+                return self._reply(204)
+            if method == 'DELETE':
+                backend.remove(table, query)
+                return self._reply(204)
+
+        def _auth(self, action, body):
+            if action == 'signup':
+                if body['email'] in backend.users:
+                    return self._reply(400, {'msg': 'User already registered'})
+                user = backend.add_user(body['email'], body['password'])
+            else:
+                user = backend.users.get(body.get('email'))
+                if user is None or user['password'] != body.get('password'):
+                    return self._reply(400, {'error': 'invalid_grant'})
+            return self._reply(200, {
+                'access_token': f"token-{user['id']}",
+                'user': {'id': user['id'], 'email': user['email']}
+            })
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PATCH(self):
+            self._handle('PATCH')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+    return Handler
@@ -0,0 +1,311 @@
+# benchmarks/run.py
+"""
+Load test of the Flask app against a local Supabase stand-in (benchmarks/fake_postgrest.py) and the
+synthetic market-data provider, so results do not depend on the network, Supabase or Yahoo.
+
+    python -m benchmarks.run                                 # every scenario at the default sizes
+    python -m benchmarks.run dashboard trade-storm --concurrency 32 --requests 2000
+    python -m benchmarks.run nightly --portfolios 10000,100000
+    python -m benchmarks.run --save-baseline                 # write benchmarks/baselines/<scenario>.json
+    python -m benchmarks.run --compare                       # exit 1 when p95/throughput regress
+
+Scenarios: login, dashboard, dashboard-legacy (the five calls /dashboard replaces), trade-storm
+(concurrent buys and sells) and nightly (update_all_portfolio_values over N portfolios).
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+import numpy as np
+import requests
+
+from benchmarks.fake_postgrest import FakePostgrest
+from benchmarks.seed import seed, PASSWORD
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+HTTP_SCENARIOS = ('login', 'dashboard', 'dashboard-legacy', 'trade-storm')
+SCENARIOS = HTTP_SCENARIOS + ('nightly',)
+
+
+def summarize(samples, statuses, failures, wall):
+    """
+    Per-endpoint count, error count, throughput (requests/s over the scenario's wall time) and
+    latency percentiles in milliseconds.
+    """
+    report = {}
+    for endpoint, durations in sorted(samples.items()):
+        durations = np.array(durations) * 1000
+        report[endpoint] = {
+            'count': len(durations),
+            'errors': failures[endpoint],
+            'statuses': dict(sorted(statuses[endpoint].items())),
+            'throughput': round(len(durations) / wall, 2),
+            'mean_ms': round(float(durations.mean()), 2),
+            'p50_ms': round(float(np.percentile(durations, 50)), 2),
+            'p95_ms': round(float(np.percentile(durations, 95)), 2),
+            'p99_ms': round(float(np.percentile(durations, 99)), 2)
+        }
+    return report
+
+
+def run_load(base_url, make_request, total, concurrency):
+    """
+    Issue `total` requests from `concurrency` threads, each with its own keep-alive session.
+    make_request(i) returns (endpoint, method, path, json_body). 5xx responses and connection
+    errors count as errors.
+    """
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    failures = Counter()
+    local = threading.local()
+
+    def send(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        endpoint, method, path, body = make_request(i)
+        started = time.perf_counter()
+        try:
+            status = session.request(method, base_url + path, json=body, timeout=60).status_code
+        except requests.RequestException:
+            status = None
+        return endpoint, status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for endpoint, status, elapsed in pool.map(send, range(total)):
+            samples[endpoint].append(elapsed)
+            statuses[endpoint][str(status)] += 1
+            if status is None or status >= 500:
+                failures[endpoint] += 1
+    return summarize(samples, statuses, failures, time.perf_counter() - started)
+
+
+def request_factory(scenario, users, rng):
+    lock = threading.Lock()
+
+    def pick():
+        with lock:
+            return rng.choice(users), rng.random()
+
+    legacy = (
+        ('get_cash_balance', lambda user: f"/get_cash_balance?user_id={user['user_id']}"),
+        ('get_all_stocks', lambda user: f"/get_all_stocks?user_id={user['user_id']}"),
+        ('get_investment_chart_data', lambda user: f"/get_investment_chart_data?user_id={user['user_id']}"),
+        ('get_portfolio_history', lambda user: f"/get_portfolio_history?portfolio_id={user['portfolio_id']}"),
+        ('watchlist', lambda user: f"/watchlist?user_id={user['user_id']}"),
+    )
+
+    def make_request(i):
+        user, draw = pick()
+        if scenario == 'login':
+            return 'authenticate', 'POST', '/authenticate', {'email': user['email'], 'password': PASSWORD}
+        if scenario == 'dashboard':
+            return 'dashboard', 'GET', f"/dashboard?user_id={user['user_id']}", None
+        if scenario == 'dashboard-legacy':
+            endpoint, path = legacy[i % len(legacy)]
+            return endpoint, 'GET', path(user), None
+        # trade-storm: mostly buys of held or new symbols, sells of held ones
+        symbol = user['symbols'][int(draw * 100) % len(user['symbols'])]
+        if draw < 0.6:
+            body = {'portfolio_id': user['portfolio_id'], 'stock_symbol': symbol, 'amount': round(100 + draw * 400, 2)}
+            return 'buy_stock', 'POST', '/buy_stock', body
+        body = {'portfolio_id': user['portfolio_id'], 'stock_symbol': symbol, 'amount': 50.0}
+        return 'sell_stock', 'POST', '/sell_stock', body
+
+    return make_request
+
+
+def upstream_report(backend):
+    with backend.lock:
+        return {
+            key: {'count': stat['count'], 'mean_ms': round(stat['seconds'] / stat['count'] * 1000, 2)}
+            for key, stat in sorted(backend.stats.items())
+        }
+
+
+def run_nightly(backend, portfolios, args):
+    backend.reset()
+    seed(backend, portfolios, active=0, symbols=args.symbols)
+    revaluation = importlib.import_module('revaluation')
+
+    started = time.perf_counter()
+    summary = revaluation.revalue_all_portfolios()
+    wall = time.perf_counter() - started
+    return {
+        'update_all_portfolio_values': {
+            'count': 1,
+            'errors': 0 if summary and not summary['failed'] and not summary['failed_snapshots'] else 1,
+            'portfolios': portfolios,
+            'seconds': round(wall, 3),
+            'throughput': round(portfolios / wall, 2)
+        }
+    }, upstream_report(backend)
+
+
+def start_app(backend_url, args, workdir):
+    """
+    Point the app at the fake Supabase and the synthetic provider, then serve it on a threaded
+    werkzeug server. The environment has to be in place before config is first imported.
+    """
+    os.environ.update({
+        'SUPABASE_URL': backend_url,
+        'SUPABASE_API_KEY': 'benchmark',
+        'MARKET_DATA_PROVIDER': 'synthetic',
+        'SYNTHETIC_LATENCY': str(args.market_latency_ms / 1000),
+        'CANDLE_STORE_PATH': os.path.join(workdir, 'candles.sqlite3'),
+        'METADATA_CACHE_PATH': os.path.join(workdir, 'metadata.sqlite3'),
+    })
+    if 'config' in sys.modules:
+        raise RuntimeError("benchmarks.run must configure the app before config is imported")
+
+    from werkzeug.serving import make_server
+    app = importlib.import_module('app').app
+    # Request logs and pool-discard warnings would drown the report
+    for name in ('', 'werkzeug', 'urllib3'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='benchmark-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def compare(name, results, tolerance):
+    """
+    Compare with the saved baseline; returns the list of regressions (p95 latency up or
+    throughput down by more than `tolerance`).
+    """
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        print(f"  no baseline for {name}")
+        return []
+
+    with open(path) as handle:
+        baseline = json.load(handle)['endpoints']
+
+    regressions = []
+    for endpoint, current in results.items():
+        previous = baseline.get(endpoint)
+        if previous is None:
+            continue
+        checks = [('throughput', previous['throughput'], current['throughput'], current['throughput'] < previous['throughput'] * (1 - tolerance))]
+        if 'p95_ms' in current:
+            checks.append(('p95_ms', previous['p95_ms'], current['p95_ms'], current['p95_ms'] > previous['p95_ms'] * (1 + tolerance)))
+        for metric, before, after, regressed in checks:
+            change = (after - before) / before * 100 if before else 0.0
+            flag = 'REGRESSION' if regressed else ''
+            print(f"  {endpoint:<28} {metric:<11} {before:>10.2f} -> {after:>10.2f} ({change:+.1f}%) {flag}")
+            if regressed:
+                regressions.append((name, endpoint, metric))
+    return regressions
+
+
+def print_report(name, results):
+    print(f"\n{name}")
+    print(f"  {'endpoint':<28} {'count':>7} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in results.items():
+        if 'p50_ms' in row:
+            print(f"  {endpoint:<28} {row['count']:>7} {row['errors']:>6} {row['throughput']:>9.1f} "
+                  f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        else:
+            print(f"  {endpoint:<28} {row['portfolios']:>7} portfolios in {row['seconds']:.2f}s "
+                  f"({row['throughput']:.0f} portfolios/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--users', type=int, default=200, help="active users the HTTP scenarios pick from")
+    parser.add_argument('--requests', type=int, default=1000, help="requests per HTTP scenario")
+    parser.add_argument('--warmup', type=int, default=50, help="unrecorded requests before each HTTP scenario")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--symbols', type=int, default=500, help="size of the symbol universe")
+    parser.add_argument('--portfolios', default='10000,100000', help="comma-separated nightly sizes")
+    parser.add_argument('--latency-ms', type=float, default=10.0, help="injected Supabase latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help="extra random Supabase latency (0..jitter)")
+    parser.add_argument('--market-latency-ms', type=float, default=50.0, help="synthetic market data latency per call")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write all results to this JSON file")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression for --compare")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    scenarios = [scenario for scenario in SCENARIOS if scenario in (args.scenarios or SCENARIOS)]
+    backend = FakePostgrest(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=args.seed)
+    backend_url = backend.start()
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    base_url, server = start_app(backend_url, args, workdir)
+
+    settings = {key: value for key, value in vars(args).items()
+                if key not in ('scenarios', 'output', 'save_baseline', 'compare', 'tolerance')}
+    all_results = {}
+    regressions = []
+
+    try:
+        for scenario in scenarios:
+            if scenario == 'nightly':
+                runs = [(f"nightly-{size}", int(size)) for size in args.portfolios.split(',') if size.strip()]
+            else:
+                runs = [(scenario, None)]
+
+            for name, portfolios in runs:
+                with open(os.devnull, 'w') as sink, redirect_stdout(sink):
+                    if portfolios is not None:
+                        results, upstream = run_nightly(backend, portfolios, args)
+                    else:
+                        backend.reset()
+                        users = seed(backend, args.users, active=args.users, symbols=args.symbols, seed=args.seed)
+                        make_request = request_factory(scenario, users, random.Random(args.seed))
+                        # Background revaluations triggered by trades must finish before the stats
+                        # are reset or read, or their calls are split between two measurements
+                        revaluation_queue = importlib.import_module('revaluation_queue').revaluation_queue
+                        if args.warmup:
+                            run_load(base_url, make_request, args.warmup, args.concurrency)
+                            revaluation_queue.join()
+                        with backend.lock:
+                            backend.stats.clear()
+                        results = run_load(base_url, make_request, args.requests, args.concurrency)
+                        revaluation_queue.join()
+                        upstream = upstream_report(backend)
+
+                all_results[name] = {'settings': settings, 'endpoints': results, 'upstream': upstream}
+                print_report(name, results)
+
+                if args.compare:
+                    regressions += compare(name, results, args.tolerance)
+                if args.save_baseline:
+                    os.makedirs(BASELINE_DIR, exist_ok=True)
+                    with open(os.path.join(BASELINE_DIR, f"{name}.json"), 'w') as handle:
+                        json.dump(all_results[name], handle, indent=2, sort_keys=True)
+                        handle.write('\n')
+    finally:
+        server.shutdown()
+        backend.stop()
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(all_results, handle, indent=2, sort_keys=True)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/seed.py
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+NAMESPACE = uuid.UUID('6f1c2b9e-3d4a-4f57-9a0e-2c8b7d5e1f30')
+PASSWORD = 'benchmark'
+
+
+def user_id(i):
+    return str(uuid.uuid5(NAMESPACE, f"user-{i}"))
+
+
+def portfolio_id(i):
+    return str(uuid.uuid5(NAMESPACE, f"portfolio-{i}"))
+
+
+def email(i):
+    return f"user{i}@benchmark.local"
+
+
+def symbol_universe(size):
+    return [f"S{i:05d}" for i in range(size)]
+
+
+def seed(backend, portfolios, active, symbols=500, holdings=4, history=90, watchlist=6, seed=0):
+    """
+    Fill the fake Supabase with `portfolios` users, each with a portfolio, open positions and a few
+    deposits/withdrawals. The first `active` users (the ones the HTTP scenarios log in as) also get
+    a daily portfolio_returns history and a watchlist. Rows depend only on the user's index, so a
+    larger dataset is a superset of a smaller one.
+    Returns the active users as [{'user_id', 'portfolio_id', 'email', 'symbols'}].
+    """
+    universe = symbol_universe(symbols)
+    now = datetime.utcnow().replace(microsecond=0)
+    users = []
+
+    for i in range(portfolios):
+        rng = random.Random(f"{seed}-{i}")
+        uid, pid = user_id(i), portfolio_id(i)
+        backend.add_user(email(i), PASSWORD, uid)
+
+        deposit = round(rng.uniform(5000, 100000), 2)
+        withdrawal = round(rng.uniform(0, deposit / 4), 2)
+        backend.insert('transactions', {'user_id': uid, 'transaction_type': 'DEPOSIT', 'amount': deposit,
+                                        'transaction_date': (now - timedelta(days=history + 30)).isoformat()})
+        backend.insert('transactions', {'user_id': uid, 'transaction_type': 'WITHDRAWAL', 'amount': withdrawal,
+                                        'transaction_date': (now - timedelta(days=rng.randint(1, history))).isoformat()})
+
+        held = rng.sample(universe, holdings)
+        invested = 0.0
+        for symbol in held:
+            quantity = round(rng.uniform(1, 50), 4)
+            average_price = round(rng.uniform(10, 500), 2)
+            invested += quantity * average_price
+            backend.insert('portfolio_stocks', {'portfolio_id': pid, 'stock_symbol': symbol, 'quantity': quantity,
+                                                'total_investment': quantity * average_price,
+                                                'average_price': average_price})
+
+        cash_balance = round(max(deposit - withdrawal - invested, 1000.0), 2)
+        backend.insert('portfolios', {'portfolio_id': pid, 'user_id': uid, 'cash_balance': cash_balance,
+                                      'total_value': cash_balance + invested})
+
+        if i >= active:
+            continue
+
+        value = cash_balance + invested
+        for day in range(history, 0, -1):
+            value *= 1 + rng.gauss(0, 0.01)
+            backend.insert('portfolio_returns', {'portfolio_id': pid, 'return_value': round(value, 2),
+                                                 'invested_value': deposit - withdrawal,
+                                                 'created_at': (now - timedelta(days=day)).isoformat()})
+
+        watchlist_id = str(uuid.uuid5(NAMESPACE, f"watchlist-{i}"))
+        backend.insert('watchlists', {'watchlist_id': watchlist_id, 'user_id': uid})
+        for symbol in rng.sample(universe, watchlist):
+            backend.insert('watchlist_stocks', {'watchlist_id': watchlist_id, 'stock_symbol': symbol})
+
+        users.append({'user_id': uid, 'portfolio_id': pid, 'email': email(i), 'symbols': held})
+
+    return users
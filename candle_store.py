@@ -0,0 +1,237 @@
+# candle_store.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from config import CANDLE_STORE_PATH, CANDLE_STORE_MAX_ROWS, CANDLE_STORE_MAX_STALENESS
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400, '1h': 3600,
+    '1d': 86400, '5d': 5 * 86400, '1wk': 7 * 86400, '1mo': 30 * 86400, '3mo': 90 * 86400
+}
+
+# Reads record their access time in memory; it is written to series.accessed_at (used for LRU
+# eviction only) in one batch at most this often, so cache hits never wait for the writer
+ACCESS_FLUSH_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    tz TEXT,
+    covered_from INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+
+def period_start(period, now=None):
+    """
+    Return the UTC epoch second a yfinance period ('7d', '6mo', '1y', 'ytd', 'max') starts at,
+    or 0 for 'max'.
+    """
+    now = pd.Timestamp.now(tz='UTC') if now is None else now
+    if period == 'max':
+        return 0
+    if period == 'ytd':
+        return int(pd.Timestamp(year=now.year, month=1, day=1, tz='UTC').timestamp())
+
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Invalid period '{period}'.")
+    count, unit = int(match.group(1)), match.group(2)
+    offset = {
+        'd': pd.DateOffset(days=count),
+        'wk': pd.DateOffset(weeks=count),
+        'mo': pd.DateOffset(months=count),
+        'y': pd.DateOffset(years=count)
+    }[unit]
+    return int((now - offset).timestamp())
+
+
+class CandleStore:
+    """
+    On-disk SQLite store of OHLCV bars keyed by (symbol, interval).
+    A series is downloaded in full once; afterwards only bars from the last stored timestamp on
+    are fetched and merged. Whole series are evicted least-recently-used once the store holds
+    more than max_rows bars. Access times are batched in memory, so reads do not write.
+    """
+
+    def __init__(self, path=CANDLE_STORE_PATH, max_rows=CANDLE_STORE_MAX_ROWS,
+                 max_staleness=CANDLE_STORE_MAX_STALENESS):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_staleness = max_staleness
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._accessed = {}  # (symbol, interval) -> last read time not yet written to series
+        self._accessed_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def _connection(self):
+        # sqlite connections cannot be shared between threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _series(self, symbol, interval):
+        row = self._connection().execute(
+            "SELECT tz, covered_from, last_ts, fetched_at FROM series WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'tz': row[0], 'covered_from': row[1], 'last_ts': row[2], 'fetched_at': row[3]}
+
+    def is_fresh(self, series, interval):
+        max_age = min(INTERVAL_SECONDS.get(interval, self.max_staleness), self.max_staleness)
+        return time.time() - series['fetched_at'] < max_age
+
+    def get_history(self, symbol, period, interval, fetch):
+        """
+        Return bars for the symbol covering the period, as a frame shaped like Ticker.history().
+        fetch(period=...) or fetch(start=...) downloads bars and returns a DataFrame, or None on timeout.
+        Returns None only when nothing is stored and the download timed out.
+        """
+        start = period_start(period)
+        series = self._series(symbol, interval)
+        covered = series is not None and series['covered_from'] <= start
+
+        if covered and self.is_fresh(series, interval):
+            return self._read(symbol, interval, start, series['tz'])
+
+        if covered and series['last_ts'] >= start:
+            # Re-fetch from the last stored bar on, it may still have been in progress
+            fetched = fetch(start=pd.Timestamp(series['last_ts'], unit='s', tz='UTC'))
+            covered_from = series['covered_from']
+        else:
+            fetched = fetch(period=period)
+            covered_from = start
+
+        if fetched is None:
+            return self._read(symbol, interval, start, series['tz']) if covered else None
+
+        if not fetched.empty:
+            self._write(symbol, interval, fetched, covered_from, replace=not covered)
+            self._evict()
+        elif not covered:
+            return fetched
+
+        tz = str(fetched.index.tz) if not fetched.empty and fetched.index.tz is not None else (series or {}).get('tz')
+        return self._read(symbol, interval, start, tz)
+
+    def _read(self, symbol, interval, start, tz):
+        conn = self._connection()
+        frame = pd.read_sql_query(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE symbol = ? AND interval = ? AND ts >= ? ORDER BY ts",
+            conn, params=(symbol, interval, start)
+        )
+        self._touch(symbol, interval)
+
+        index = pd.to_datetime(frame['ts'], unit='s', utc=True)
+        if tz:
+            index = index.dt.tz_convert(tz)
+        frame = frame.drop(columns='ts')
+        frame.columns = COLUMNS
+        frame.index = pd.DatetimeIndex(index, name='Date')
+        return frame
+
+    def _touch(self, symbol, interval):
+        with self._accessed_lock:
+            self._accessed[(symbol, interval)] = time.time()
+            due = time.monotonic() - self._flushed_at >= ACCESS_FLUSH_INTERVAL
+        if due:
+            with self._write_lock:
+                self._flush_accesses()
+
+    def _flush_accesses(self):
+        # Called with the write lock held
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+            self._flushed_at = time.monotonic()
+        if not accessed:
+            return
+        conn = self._connection()
+        conn.executemany(
+            "UPDATE series SET accessed_at = MAX(accessed_at, ?) WHERE symbol = ? AND interval = ?",
+            [(accessed_at, symbol, interval) for (symbol, interval), accessed_at in accessed.items()]
+        )
+        conn.commit()
+
+    def _write(self, symbol, interval, hist, covered_from, replace):
+        bars = hist[COLUMNS].copy()
+        bars['Volume'] = bars['Volume'].fillna(0).astype('int64')
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+        timestamps = (index.tz_convert('UTC').as_unit('s').asi8 if hasattr(index, 'as_unit')
+                      else index.tz_convert('UTC').asi8 // 10**9)
+        rows = [
+            (symbol, interval, int(ts), float(o), float(h), float(l), float(c), int(v))
+            for ts, o, h, l, c, v in zip(timestamps, bars['Open'], bars['High'], bars['Low'],
+                                         bars['Close'], bars['Volume'])
+        ]
+        tz = str(hist.index.tz) if hist.index.tz is not None else 'UTC'
+        now = time.time()
+
+        conn = self._connection()
+        with self._write_lock:
+            if replace:
+                conn.execute("DELETE FROM candles WHERE symbol = ? AND interval = ?", (symbol, interval))
+            conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            last_ts, row_count = conn.execute(
+                "SELECT MAX(ts), COUNT(*) FROM candles WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (symbol, interval, tz, covered_from, last_ts, row_count, now, now)
+            )
+            conn.commit()
+
+    def _evict(self):
+        conn = self._connection()
+        with self._write_lock:
+            # Eviction order needs the reads made since the last flush
+            self._flush_accesses()
+            total = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM series").fetchone()[0]
+            if total <= self.max_rows:
+                return
+            for symbol, interval, row_count in conn.execute(
+                    "SELECT symbol, interval, row_count FROM series ORDER BY accessed_at").fetchall():
+                if total <= self.max_rows:
+                    break
+                conn.execute("DELETE FROM candles WHERE symbol = ? AND interval = ?", (symbol, interval))
+                conn.execute("DELETE FROM series WHERE symbol = ? AND interval = ?", (symbol, interval))
+                total -= row_count
+            conn.commit()
+
+
+# Shared store used by the historical data route
+candle_store = CandleStore()
@@ -0,0 +1,87 @@
+# compression.py
+
+import gzip
+from flask import request
+from config import COMPRESSION_MIN_SIZE, COMPRESSION_ALGORITHMS, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses fall back to gzip without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/javascript',
+}
+
+ENCODERS = {
+    'br': lambda data: brotli.compress(data, quality=BROTLI_QUALITY),
+    'gzip': lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL),
+}
+
+
+def available_encodings():
+    """Configured encodings in preference order, minus those whose library is missing."""
+    return [encoding for encoding in COMPRESSION_ALGORITHMS
+            if encoding in ENCODERS and (encoding != 'br' or brotli is not None)]
+
+
+def choose_encoding(accept_encodings, encodings):
+    """Best encoding the client accepts (highest q, server preference on ties), or None."""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response):
+    """
+    after_request hook: compresses buffered responses above COMPRESSION_MIN_SIZE with br or gzip,
+    whichever the client's Accept-Encoding prefers. Streams (SSE), 304s and already-encoded
+    bodies are left alone.
+
+    A 304 still carries the body it replaces at this point (werkzeug drops it when sending), so it
+    goes through the same checks and, where the 200 would have been compressed, gets the same
+    weak ETag instead of the strong one.
+    """
+    not_modified = response.status_code == 304
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if response.content_length is not None and response.content_length < COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings, available_encodings())
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    if not not_modified:
+        response.set_data(ENCODERS[encoding](data))
+        response.headers['Content-Encoding'] = encoding
+
+    # The encoded body differs byte-wise from the one the ETag was computed on, so the tag is
+    # downgraded to weak; If-None-Match still matches it (weak comparison) for 304s.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -19,3 +19,80 @@ HEADERS = {
     "Authorization": f"Bearer {SUPABASE_API_KEY}",
     "Content-Type": "application/json"
 }
+
+# Quote cache configuration (seconds / number of symbols kept in memory)
+QUOTE_CACHE_TTL = int(os.getenv("QUOTE_CACHE_TTL", "60"))
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "1024"))
+
+# Supabase HTTP client configuration (the pool is created separately in every gunicorn worker)
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3.05"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "15"))
+SUPABASE_MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", "3"))
+SUPABASE_RETRY_BACKOFF = float(os.getenv("SUPABASE_RETRY_BACKOFF", "0.3"))
+SUPABASE_BULK_CHUNK_SIZE = int(os.getenv("SUPABASE_BULK_CHUNK_SIZE", "500"))
+
+# Nightly revaluation job configuration
+REVALUATION_PAGE_SIZE = int(os.getenv("REVALUATION_PAGE_SIZE", "1000"))
+REVALUATION_PRICE_BATCH = int(os.getenv("REVALUATION_PRICE_BATCH", "500"))
+
+# Local OHLCV candle store used by /get_historical_data
+CANDLE_STORE_PATH = os.getenv("CANDLE_STORE_PATH", "data/candles.sqlite3")
+CANDLE_STORE_MAX_ROWS = int(os.getenv("CANDLE_STORE_MAX_ROWS", "2000000"))
+CANDLE_STORE_MAX_STALENESS = int(os.getenv("CANDLE_STORE_MAX_STALENESS", "300"))
+
+# Bounded worker pool for market data provider calls
+MARKET_DATA_WORKERS = int(os.getenv("MARKET_DATA_WORKERS", "8"))
+MARKET_DATA_MAX_PENDING = int(os.getenv("MARKET_DATA_MAX_PENDING", "64"))
+# Separate, smaller pool for company metadata lookups
+METADATA_WORKERS = int(os.getenv("METADATA_WORKERS", "4"))
+
+# Company metadata (ticker.info) cache, persisted locally
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "data/metadata.sqlite3")
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "86400"))
+
+# Upper bound (seconds) for assembling quote snapshots of a watchlist
+WATCHLIST_DEADLINE = float(os.getenv("WATCHLIST_DEADLINE", "5"))
+
+# Background revaluation queue used after trades and deposits
+REVALUATION_QUEUE_WORKERS = int(os.getenv("REVALUATION_QUEUE_WORKERS", "2"))
+
+# In-memory position book: seconds before a portfolio is reloaded from Supabase
+POSITION_BOOK_TTL = int(os.getenv("POSITION_BOOK_TTL", "60"))
+
+# Live price stream (/stream_prices): poll interval, symbols per batched download, heartbeat and per-client limit
+PRICE_STREAM_INTERVAL = float(os.getenv("PRICE_STREAM_INTERVAL", "5"))
+PRICE_STREAM_BATCH = int(os.getenv("PRICE_STREAM_BATCH", "200"))
+PRICE_STREAM_HEARTBEAT = float(os.getenv("PRICE_STREAM_HEARTBEAT", "15"))
+PRICE_STREAM_MAX_SYMBOLS = int(os.getenv("PRICE_STREAM_MAX_SYMBOLS", "50"))
+# Open streams per worker process; each holds one of the worker's threads. Under gunicorn it defaults
+# to the threads not reserved for the API routes (see gunicorn.conf.py)
+PRICE_STREAM_MAX_CLIENTS = int(os.getenv("PRICE_STREAM_MAX_CLIENTS", "8"))
+
+# JSON encoding: "orjson" (falls back to the stdlib when not installed) or "default"
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
+# Response compression: minimum body size in bytes, encodings in preference order and levels
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ALGORITHMS = [encoding.strip() for encoding in os.getenv("COMPRESSION_ALGORITHMS", "br,gzip").split(",") if encoding.strip()]
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Cache-Control max-age (seconds) for read endpoints: market data is public, portfolio/watchlist data private
+MARKET_DATA_MAX_AGE = int(os.getenv("MARKET_DATA_MAX_AGE", "60"))
+QUOTE_MAX_AGE = int(os.getenv("QUOTE_MAX_AGE", "15"))
+USER_DATA_MAX_AGE = int(os.getenv("USER_DATA_MAX_AGE", "0"))
+
+# user_id -> portfolio_id / watchlist_id identity cache
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "86400"))
+IDENTITY_CACHE_MAX_SIZE = int(os.getenv("IDENTITY_CACHE_MAX_SIZE", "100000"))
+
+# Market data backend: "yfinance", "record" (yfinance, responses saved to MARKET_DATA_RECORD_PATH),
+# "replay" (recorded responses only) or "synthetic" (local random walk with SYNTHETIC_LATENCY seconds per call)
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+MARKET_DATA_RECORD_PATH = os.getenv("MARKET_DATA_RECORD_PATH", "data/market_recordings")
+SYNTHETIC_LATENCY = float(os.getenv("SYNTHETIC_LATENCY", "0.05"))
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+
+# Server-Timing header with the outbound calls (Supabase tables, market data methods) of every request
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
@@ -0,0 +1,84 @@
+# downsampling.py
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` indices of the (x, y) series that preserve its
+    visual shape. The first and last points are always kept.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 inner points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def lttb(hist, max_points, column='Close'):
+    """
+    Downsample an OHLCV frame to max_points rows chosen by LTTB on the given column.
+    """
+    if len(hist) <= max_points:
+        return hist
+    x = hist.index.asi8 if isinstance(hist.index, pd.DatetimeIndex) else np.arange(len(hist))
+    return hist.iloc[lttb_indices(x, hist[column].to_numpy(), max_points)]
+
+
+def ohlc_buckets(hist, max_points):
+    """
+    Aggregate consecutive bars of an OHLCV frame into at most max_points buckets:
+    first open, max high, min low, last close and summed volume, stamped with the first bar's date.
+    """
+    n = len(hist)
+    if n <= max_points:
+        return hist
+
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(int)
+    starts = np.unique(starts)
+    ends = np.append(starts[1:], n) - 1
+
+    return pd.DataFrame({
+        'Open': hist['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(hist['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(hist['Low'].to_numpy(), starts),
+        'Close': hist['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(hist['Volume'].fillna(0).to_numpy(), starts)
+    }, index=hist.index[starts])
+
+
+DOWNSAMPLERS = {
+    'ohlc': ohlc_buckets,
+    'lttb': lttb
+}
+
+
+def downsample(hist, max_points, method='ohlc'):
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Invalid downsampling method '{method}'.")
+    return DOWNSAMPLERS[method](hist, max_points)
@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+
+import os
+import shutil
+
+bind = "0.0.0.0:5000"
+# Threaded workers, so open price streams do not block a whole worker each
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+# Every open price stream holds a thread; GUNICORN_API_THREADS of each worker's threads are kept
+# for the API routes and the rest may serve streams. Behind nginx the streams go to the separate
+# `streams` service (docker-compose.yml): one worker, so one price poller, with many threads.
+api_threads = int(os.environ.get("GUNICORN_API_THREADS", "8"))
+os.environ.setdefault("PRICE_STREAM_MAX_CLIENTS", str(max(threads - api_threads, 0)))
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be added to the new one
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker; its counters and histograms keep counting
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,44 @@
+# http_cache.py
+
+import hashlib
+from functools import wraps
+from flask import request, jsonify, make_response
+
+
+def json_with_etag(payload):
+    """
+    JSON response with a strong ETag computed from the body; answers 304 Not Modified when the
+    request's If-None-Match already names it.
+    """
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    return response.make_conditional(request)
+
+
+def conditional_get(max_age=0, public=False):
+    """
+    Decorator for read endpoints: successful responses get Cache-Control (public or private,
+    max-age seconds) and an ETag, and If-None-Match is answered with 304 Not Modified.
+    Views may set their own ETag (e.g. from a data version); otherwise it is hashed from the body.
+    Error responses are passed through uncached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+            if request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+                return response
+
+            if public:
+                response.cache_control.public = True
+            else:
+                response.cache_control.private = True
+            response.cache_control.max_age = max_age
+
+            if response.status_code == 200 and not response.is_streamed:
+                if response.get_etag()[0] is None:
+                    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+                response = response.make_conditional(request)
+            return response
+        return wrapper
+    return decorator
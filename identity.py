@@ -0,0 +1,55 @@
+# identity.py
+
+from supabase_client import get_from_supabase
+from ttl_cache import TTLCache
+from config import IDENTITY_CACHE_TTL, IDENTITY_CACHE_MAX_SIZE
+
+# user_id -> portfolio_id / watchlist_id. The mappings do not change once created, so only found ids
+# are cached (a missing one may be created by another process) and the TTL merely bounds memory.
+portfolio_ids = TTLCache(ttl=IDENTITY_CACHE_TTL, max_size=IDENTITY_CACHE_MAX_SIZE)
+watchlist_ids = TTLCache(ttl=IDENTITY_CACHE_TTL, max_size=IDENTITY_CACHE_MAX_SIZE)
+
+
+def _resolve(cache, table, id_column, user_id):
+    cached = cache.get(user_id)
+    if cached is not None:
+        return cached, None
+
+    response = get_from_supabase(table, params={'user_id': f'eq.{user_id}', 'select': id_column})
+    if response.status_code != 200:
+        return None, response
+
+    rows = response.json()
+    if not rows:
+        return None, None
+
+    cache.set(user_id, rows[0][id_column])
+    return rows[0][id_column], None
+
+
+def resolve_portfolio_id(user_id):
+    """
+    The user's portfolio_id. Returns (portfolio_id, failed_response); portfolio_id is None when the
+    user has no portfolio.
+    """
+    return _resolve(portfolio_ids, 'portfolios', 'portfolio_id', user_id)
+
+
+def resolve_watchlist_id(user_id):
+    """
+    The user's watchlist_id. Returns (watchlist_id, failed_response); watchlist_id is None when the
+    user has no watchlist yet.
+    """
+    return _resolve(watchlist_ids, 'watchlists', 'watchlist_id', user_id)
+
+
+def remember_portfolio_id(user_id, portfolio_id):
+    """Record a portfolio found at login or just created, replacing any cached mapping."""
+    portfolio_ids.invalidate(user_id)
+    portfolio_ids.set(user_id, portfolio_id)
+
+
+def remember_watchlist_id(user_id, watchlist_id):
+    """Record a watchlist found or just created, replacing any cached mapping."""
+    watchlist_ids.invalidate(user_id)
+    watchlist_ids.set(user_id, watchlist_id)
@@ -0,0 +1,126 @@
+# instrumentation.py
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+
+from flask import g, request
+from config import SERVER_TIMING
+
+try:
+    from prometheus_client import Histogram
+except ImportError:  # prometheus_client is optional; without it only Server-Timing is reported
+    Histogram = None
+
+# Latencies from a few milliseconds (cached Supabase reads) up to slow yfinance downloads
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if Histogram is not None:
+    REQUEST_DURATION = Histogram(
+        'http_request_duration_seconds', 'Time spent serving HTTP requests',
+        ['method', 'route', 'status'], buckets=BUCKETS
+    )
+    UPSTREAM_DURATION = Histogram(
+        'upstream_call_duration_seconds', 'Time spent in outbound calls (Supabase tables, market data methods)',
+        ['upstream', 'target'], buckets=BUCKETS
+    )
+else:
+    REQUEST_DURATION = UPSTREAM_DURATION = None
+
+_current = ContextVar('request_timings', default=None)
+
+# Server-Timing metric names are HTTP tokens
+_NOT_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class RequestTimings:
+    """
+    Count and total duration of the outbound calls made while serving one request, per upstream
+    and target (e.g. supabase/portfolios, yfinance/history). Calls run on executor threads add
+    to it concurrently, so their durations may overlap and sum to more than the request itself.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = {}  # (upstream, target) -> [count, seconds]
+        self._lock = threading.Lock()
+
+    def add(self, upstream, target, seconds):
+        with self._lock:
+            entry = self.calls.setdefault((upstream, target), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def server_timing(self):
+        """
+        Server-Timing header value: one metric per upstream target plus the total, in milliseconds.
+        """
+        with self._lock:
+            calls = sorted(self.calls.items(), key=lambda item: item[1][1], reverse=True)
+        metrics = [
+            f'{_NOT_TOKEN.sub("-", f"{upstream}-{target}")};dur={seconds * 1000:.1f};desc="{count}x"'
+            for (upstream, target), (count, seconds) in calls
+        ]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+@contextmanager
+def track(upstream, target):
+    """
+    Time an outbound call, e.g. `with track('supabase', 'portfolios'): ...`. The duration goes to
+    the current request's timings (when there is one) and to the upstream histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        timings = _current.get()
+        if timings is not None:
+            timings.add(upstream, target, seconds)
+        if UPSTREAM_DURATION is not None:
+            UPSTREAM_DURATION.labels(upstream, target).observe(seconds)
+
+
+def bind(fn, *args, **kwargs):
+    """
+    Wrap a call that will run on another thread so it keeps the submitting request's context and
+    its outbound calls are charged to that request (executors do not propagate contextvars).
+    """
+    return partial(copy_context().run, fn, *args, **kwargs)
+
+
+def _start_request():
+    g.request_timings = RequestTimings()
+    g.request_timings_token = _current.set(g.request_timings)
+
+
+def _finish_request(response):
+    timings = g.get('request_timings')
+    if timings is None:
+        return response
+
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = timings.server_timing()
+    if REQUEST_DURATION is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_DURATION.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - timings.started
+        )
+    return response
+
+
+def _reset_request(exc):
+    token = g.pop('request_timings_token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_instrumentation(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_reset_request)
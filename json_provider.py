@@ -0,0 +1,85 @@
+# json_provider.py
+
+import datetime
+import decimal
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; Flask's stdlib provider is used without it
+    orjson = None
+
+
+def _default(obj):
+    """
+    Fallback for values neither json nor orjson encode natively: NumPy/pandas scalars,
+    Timestamps, NaT and Decimals coming out of DataFrames.
+    """
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    Stdlib JSON provider that also understands NumPy/pandas values.
+    """
+    @staticmethod
+    def default(obj):
+        try:
+            return _default(obj)
+        except TypeError:
+            return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson. Responses are built straight from the encoded bytes,
+    NumPy arrays/scalars are serialized natively and NaN/inf become null.
+    """
+    def _options(self, pretty=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options(bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    "orjson": OrjsonProvider,
+    "default": NumpyJSONProvider,
+}
+
+
+def get_json_provider_class(name):
+    """
+    Provider class for JSON_PROVIDER; falls back to the stdlib provider when orjson is not installed.
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER {name!r}, expected one of {sorted(PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        return NumpyJSONProvider
+    return PROVIDERS[name]
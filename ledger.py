@@ -0,0 +1,55 @@
+# ledger.py
+
+from supabase_client import get_from_supabase
+
+
+def _totals(total_deposits, total_withdrawals, last_transaction_date):
+    total_deposits = total_deposits or 0
+    total_withdrawals = total_withdrawals or 0
+    return {
+        "total_deposits": total_deposits,
+        "total_withdrawals": total_withdrawals,
+        "total_invested": total_deposits - total_withdrawals,
+        "last_transaction_date": last_transaction_date
+    }
+
+
+def _aggregate_totals(user_id):
+    # Server-side aggregation (requires PostgREST aggregate functions to be enabled)
+    response = get_from_supabase("transactions", params={
+        "select": "transaction_type,amount.sum(),transaction_date.max()",
+        "user_id": f"eq.{user_id}",
+        "transaction_type": "in.(DEPOSIT,WITHDRAWAL)"
+    })
+    if response.status_code != 200:
+        return None, response
+
+    groups = {row["transaction_type"]: row for row in response.json()}
+    dates = [row.get("max") for row in groups.values() if row.get("max")]
+    return _totals(
+        groups.get("DEPOSIT", {}).get("sum"),
+        groups.get("WITHDRAWAL", {}).get("sum"),
+        max(dates) if dates else None
+    ), None
+
+
+def get_ledger_totals(user_id):
+    """
+    Return the user's deposit/withdrawal totals and the date of the last transaction as
+    (totals, failed_response). Totals come from the trigger-maintained user_ledger_totals row
+    (sql/user_ledger_totals.sql), or from a server-side aggregate where that table is missing.
+    """
+    response = get_from_supabase("user_ledger_totals", params={
+        "select": "total_deposits,total_withdrawals,last_transaction_date",
+        "user_id": f"eq.{user_id}"
+    })
+    if response.status_code != 200:
+        return _aggregate_totals(user_id)
+
+    rows = response.json()
+    if not rows:
+        # No deposits or withdrawals yet
+        return _totals(0, 0, None), None
+
+    row = rows[0]
+    return _totals(row["total_deposits"], row["total_withdrawals"], row["last_transaction_date"]), None
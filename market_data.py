@@ -0,0 +1,376 @@
+# market_data.py
+
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from urllib.parse import quote as quote_path
+
+import numpy as np
+import pandas as pd
+
+from candle_store import INTERVAL_SECONDS, period_start
+from config import (MARKET_DATA_PROVIDER, MARKET_DATA_RECORD_PATH, SYNTHETIC_LATENCY, SYNTHETIC_SEED)
+from instrumentation import track
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _empty_history():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], tz='UTC', name='Date'))
+
+
+def _recording_file(path, *parts):
+    # Symbols may contain characters that are not safe in file names (e.g. "^GSPC", "BRK/B")
+    return os.path.join(path, *parts[:-1], quote_path(parts[-1], safe=''))
+
+
+def _last_close(bars):
+    closes = bars['Close'].dropna() if bars is not None and 'Close' in bars else ()
+    return float(closes.iloc[-1]) if len(closes) else None
+
+
+class MarketDataProvider(ABC):
+    """
+    Source of quotes, OHLCV history and company metadata. Backends implement history, metadata and
+    (when they can batch) daily_bars; quotes are derived from the bars.
+    """
+
+    @abstractmethod
+    def history(self, symbol, period=None, interval='1d', start=None):
+        """
+        OHLCV bars (Open/High/Low/Close/Volume columns, tz-aware DatetimeIndex) for a yfinance-style
+        period ('5d', '6mo', 'ytd', 'max') or from `start` onwards. Empty when there is no data.
+        """
+
+    @abstractmethod
+    def metadata(self, symbol):
+        """
+        Company metadata as a ticker.info-style dict (shortName, currency, fiftyTwoWeekLow, ...).
+        """
+
+    def daily_bars(self, symbols, days=5):
+        """
+        The last few daily bars of every symbol. Returns (bars, failures): symbol -> DataFrame and
+        symbol -> error message.
+        """
+        bars = {}
+        failures = {}
+        for symbol in dict.fromkeys(symbols):
+            try:
+                frame = self.history(symbol, period=f"{days}d", interval='1d')
+            except Exception as e:
+                failures[symbol] = str(e)
+                continue
+            if _last_close(frame) is None:
+                failures[symbol] = "No price data returned"
+            else:
+                bars[symbol] = frame
+        return bars, failures
+
+    def quote(self, symbol):
+        """
+        Latest closing price of the symbol, or None without data.
+        """
+        return _last_close(self.history(symbol, period='1d', interval='1d'))
+
+    def quotes(self, symbols):
+        """
+        Latest closing prices of many symbols at once. Returns (prices, failures); a few days of bars
+        are read so symbols that have not traded yet today still get their last close.
+        """
+        bars, failures = self.daily_bars(symbols)
+        prices = {}
+        for symbol, frame in bars.items():
+            price = _last_close(frame)
+            if price is None:
+                failures[symbol] = "No price data returned"
+            else:
+                prices[symbol] = price
+        return prices, failures
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance through yfinance (the default backend).
+    """
+
+    def __init__(self):
+        import yfinance
+        self.yf = yfinance
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        ticker = self.yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def metadata(self, symbol):
+        return self.yf.Ticker(symbol).info or {}
+
+    def daily_bars(self, symbols, days=5):
+        # One batched download for all symbols
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}, {}
+
+        data = self.yf.download(symbols, period=f"{days}d", interval="1d", group_by="ticker",
+                                auto_adjust=False, threads=True, progress=False)
+
+        bars = {}
+        failures = {}
+        for symbol in symbols:
+            if data is None or data.empty:
+                frame = None
+            elif hasattr(data.columns, 'levels'):
+                frame = data[symbol] if symbol in data.columns.get_level_values(0) else None
+            else:
+                # Single-symbol downloads come back with flat columns
+                frame = data
+
+            if _last_close(frame) is None:
+                failures[symbol] = "No price data returned"
+            else:
+                bars[symbol] = frame
+        return bars, failures
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Passes calls through to another provider and records the responses under `path`, so they can be
+    served later by ReplayProvider. History is kept per symbol and interval (daily bars are stored as
+    1d history), every new response merged into what was recorded before.
+    """
+
+    def __init__(self, inner, path=MARKET_DATA_RECORD_PATH):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, file, write):
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as handle:
+            write(handle)
+        os.replace(tmp, file)
+
+    def _record_history(self, symbol, interval, frame):
+        if frame is None or frame.empty:
+            return
+        file = _recording_file(self.path, 'history', interval, f"{symbol}.pkl")
+        with self._lock:
+            if os.path.exists(file):
+                recorded = pd.read_pickle(file)
+                frame = pd.concat([recorded, frame[COLUMNS]])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+            frame = frame[COLUMNS]
+            self._write(file, lambda handle: pickle.dump(frame, handle))
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        frame = self.inner.history(symbol, period=period, interval=interval, start=start)
+        self._record_history(symbol, interval, frame)
+        return frame
+
+    def daily_bars(self, symbols, days=5):
+        bars, failures = self.inner.daily_bars(symbols, days)
+        for symbol, frame in bars.items():
+            self._record_history(symbol, '1d', frame)
+        return bars, failures
+
+    def metadata(self, symbol):
+        info = self.inner.metadata(symbol)
+        data = json.dumps(info, default=str).encode()
+        with self._lock:
+            self._write(_recording_file(self.path, 'metadata', f"{symbol}.json"), lambda handle: handle.write(data))
+        return info
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves responses recorded by RecordingProvider without touching the network. Periods are measured
+    back from the last recorded bar, so old recordings keep returning the same data.
+    """
+
+    def __init__(self, path=MARKET_DATA_RECORD_PATH):
+        self.path = path
+
+    @lru_cache(maxsize=1024)
+    def _recorded(self, symbol, interval):
+        file = _recording_file(self.path, 'history', interval, f"{symbol}.pkl")
+        return pd.read_pickle(file) if os.path.exists(file) else _empty_history()
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        frame = self._recorded(symbol, interval)
+        if frame.empty:
+            return frame.copy()
+
+        if start is not None:
+            cutoff = pd.Timestamp(start)
+        else:
+            last = frame.index[-1]
+            now = pd.Timestamp.now(tz=last.tz)
+            cutoff = last - (now - pd.Timestamp(period_start(period), unit='s', tz='UTC'))
+        if cutoff.tzinfo is None and frame.index.tz is not None:
+            cutoff = cutoff.tz_localize(frame.index.tz)
+        return frame[frame.index >= cutoff].copy()
+
+    def metadata(self, symbol):
+        file = _recording_file(self.path, 'metadata', f"{symbol}.json")
+        if not os.path.exists(file):
+            return {}
+        with open(file) as handle:
+            return json.load(handle)
+
+
+# Synthetic prices: a daily geometric random walk per symbol from this date, with deterministic
+# intraday noise in between, so any interval and any start give the same, consistent bars
+SYNTHETIC_EPOCH = int(pd.Timestamp('2000-01-03', tz='UTC').timestamp())
+SYNTHETIC_DAYS = 20000
+
+
+def _hash_noise(seed, values):
+    """
+    Deterministic pseudo-random numbers in [-1, 1) for integer values (splitmix64 finalizer).
+    """
+    x = values.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) ^ np.uint64(seed)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xC4CEB9FE1A85EC53)
+    x ^= x >> np.uint64(33)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53) * 2 - 1
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Random-walk market data for any symbol, generated locally and deterministically (per symbol and
+    seed), with an artificial `latency` in seconds per call to stand in for the network.
+    """
+
+    def __init__(self, latency=SYNTHETIC_LATENCY, seed=SYNTHETIC_SEED):
+        self.latency = latency
+        self.seed = seed
+
+    def _wait(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _symbol_seed(self, symbol):
+        return zlib.crc32(f"{self.seed}:{symbol}".encode())
+
+    @lru_cache(maxsize=256)
+    def _walk(self, symbol):
+        # Log prices of the daily closes, starting between 10 and 500
+        rng = np.random.default_rng(self._symbol_seed(symbol))
+        start = np.log(rng.uniform(10, 500))
+        return start + np.cumsum(rng.normal(0.0, 0.012, SYNTHETIC_DAYS))
+
+    def _prices(self, symbol, timestamps):
+        walk = self._walk(symbol)
+        days = np.clip((timestamps - SYNTHETIC_EPOCH) / 86400, 0, SYNTHETIC_DAYS - 2)
+        day = days.astype(np.int64)
+        log_price = walk[day] + (walk[day + 1] - walk[day]) * (days - day)
+        log_price += _hash_noise(self._symbol_seed(symbol), timestamps) * 0.002
+        return np.round(np.exp(log_price), 4)
+
+    def _bars(self, symbol, interval, start):
+        step = INTERVAL_SECONDS[interval]
+        now = int(time.time())
+        first = max(int(start), SYNTHETIC_EPOCH) // step * step
+        timestamps = np.arange(first, now, step, dtype=np.int64)
+        if not len(timestamps):
+            return _empty_history()
+
+        seed = self._symbol_seed(symbol)
+        opens = self._prices(symbol, timestamps)
+        closes = self._prices(symbol, np.minimum(timestamps + step, now))
+        spread = 1 + np.abs(_hash_noise(seed + 1, timestamps)) * 0.005
+        return pd.DataFrame({
+            'Open': opens,
+            'High': np.round(np.maximum(opens, closes) * spread, 4),
+            'Low': np.round(np.minimum(opens, closes) / spread, 4),
+            'Close': closes,
+            'Volume': (1_000_000 * (1.5 + _hash_noise(seed + 2, timestamps))).astype(np.int64)
+        }, index=pd.DatetimeIndex(pd.to_datetime(timestamps, unit='s', utc=True), name='Date'))
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        self._wait()
+        start = pd.Timestamp(start).timestamp() if start is not None else period_start(period)
+        return self._bars(symbol, interval, start)
+
+    def daily_bars(self, symbols, days=5):
+        # A batch costs one round trip, like a batched download
+        self._wait()
+        start = period_start(f"{days}d")
+        return {symbol: self._bars(symbol, '1d', start) for symbol in dict.fromkeys(symbols)}, {}
+
+    def quote(self, symbol):
+        self._wait()
+        return float(self._prices(symbol, np.array([int(time.time())]))[0])
+
+    def metadata(self, symbol):
+        self._wait()
+        closes = self._bars(symbol, '1d', period_start('1y'))['Close']
+        return {
+            'shortName': f"{symbol} Corp.",
+            'longName': f"{symbol} Synthetic Corporation",
+            'currency': 'USD',
+            'exchange': 'SYN',
+            'fiftyTwoWeekLow': float(closes.min()),
+            'fiftyTwoWeekHigh': float(closes.max())
+        }
+
+
+class InstrumentedProvider(MarketDataProvider):
+    """
+    Times every call of another provider per method (history, daily_bars, quote, quotes, metadata)
+    for the Server-Timing header and the upstream histograms, labelled with the backend's name.
+    """
+
+    def __init__(self, inner, name):
+        self.inner = inner
+        self.name = name
+
+    def history(self, symbol, period=None, interval='1d', start=None):
+        with track(self.name, 'history'):
+            return self.inner.history(symbol, period=period, interval=interval, start=start)
+
+    def metadata(self, symbol):
+        with track(self.name, 'metadata'):
+            return self.inner.metadata(symbol)
+
+    def daily_bars(self, symbols, days=5):
+        with track(self.name, 'daily_bars'):
+            return self.inner.daily_bars(symbols, days)
+
+    def quote(self, symbol):
+        with track(self.name, 'quote'):
+            return self.inner.quote(symbol)
+
+    def quotes(self, symbols):
+        with track(self.name, 'quotes'):
+            return self.inner.quotes(symbols)
+
+
+def get_provider(name=MARKET_DATA_PROVIDER):
+    """
+    Build the provider named by MARKET_DATA_PROVIDER: yfinance, record (yfinance, recorded to
+    MARKET_DATA_RECORD_PATH), replay or synthetic.
+    """
+    if name == 'yfinance':
+        return YFinanceProvider()
+    if name == 'record':
+        return RecordingProvider(YFinanceProvider())
+    if name == 'replay':
+        return ReplayProvider()
+    if name == 'synthetic':
+        return SyntheticProvider()
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER {name!r}, expected yfinance, record, replay or synthetic")
+
+
+# Shared provider used by the quote, snapshot, metadata and history code
+provider = InstrumentedProvider(get_provider(), MARKET_DATA_PROVIDER)
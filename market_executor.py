@@ -0,0 +1,84 @@
+# market_executor.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from config import MARKET_DATA_WORKERS, MARKET_DATA_MAX_PENDING, METADATA_WORKERS
+from instrumentation import bind
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when too many distinct market data calls are already queued or running.
+    """
+
+
+class SingleFlightExecutor:
+    """
+    Bounded thread pool for slow upstream calls with single-flight coalescing: concurrent calls
+    with the same key share one in-flight future. A caller that times out stops waiting, but the
+    future stays registered until it finishes, so later callers join it instead of starting a new
+    call and the number of running calls never exceeds the pool size.
+    """
+
+    def __init__(self, max_workers=MARKET_DATA_WORKERS, max_pending=MARKET_DATA_MAX_PENDING, name="market-data"):
+        self.max_pending = max_pending
+        self.submitted = 0
+        self.coalesced = 0
+        self.timed_out = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+
+            if len(self._in_flight) >= self.max_pending:
+                raise ExecutorSaturated(f"{len(self._in_flight)} market data calls already pending")
+
+            # Coalesced callers share the call, its time is charged to the request that started it
+            future = self._executor.submit(bind(fn, *args, **kwargs))
+            self._in_flight[key] = future
+            self.submitted += 1
+
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def call(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn through the pool (or join the in-flight call with the same key) and wait for it.
+        Returns None when the wait times out; exceptions raised by fn are propagated.
+        """
+        future = self.submit(key, fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "timed_out": self.timed_out
+            }
+
+
+# Shared pool for every market data call made while serving requests
+market_executor = SingleFlightExecutor()
+
+# Company metadata (ticker.info) is slow and rarely needed right away; it has its own pool so a
+# cold metadata cache never queues ahead of the quote downloads a response is waiting for
+metadata_executor = SingleFlightExecutor(max_workers=METADATA_WORKERS, name="metadata")
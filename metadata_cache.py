@@ -0,0 +1,142 @@
+# metadata_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import METADATA_CACHE_PATH, METADATA_CACHE_TTL
+from market_executor import metadata_executor
+from market_data import provider
+
+# Only the rarely changing fields the app actually shows are kept
+METADATA_FIELDS = ('shortName', 'longName', 'currency', 'exchange', 'fiftyTwoWeekLow', 'fiftyTwoWeekHigh')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    symbol TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def _fetch_metadata(symbol):
+    info = provider.metadata(symbol) or {}
+    return {field: info[field] for field in METADATA_FIELDS if info.get(field) is not None}
+
+
+class MetadataCache:
+    """
+    Long-lived cache of company metadata (ticker.info), kept in memory and persisted in SQLite so
+    it survives restarts. Expired entries are still served while a background refresh runs.
+    """
+
+    def __init__(self, path=METADATA_CACHE_PATH, ttl=METADATA_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}  # symbol -> (data, fetched_at)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _load(self):
+        if self._loaded:
+            return
+        rows = self._connection().execute("SELECT symbol, data, fetched_at FROM metadata").fetchall()
+        with self._lock:
+            for symbol, data, fetched_at in rows:
+                self._entries.setdefault(symbol, (json.loads(data), fetched_at))
+            self._loaded = True
+
+    def _store(self, symbol, data):
+        fetched_at = time.time()
+        with self._lock:
+            self._entries[symbol] = (data, fetched_at)
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)", (symbol, json.dumps(data), fetched_at))
+        conn.commit()
+        return data
+
+    def _refresh(self, symbol):
+        return self._store(symbol, _fetch_metadata(symbol))
+
+    def refresh_async(self, symbol):
+        """
+        Schedule a background refresh of the symbol (coalesced with any refresh already running).
+        """
+        return metadata_executor.submit(('info', symbol), self._refresh, symbol)
+
+    def get(self, symbol):
+        """
+        Return the metadata dict for the symbol. Missing symbols are fetched synchronously; expired
+        ones are returned as they are while a refresh runs in the background.
+        Returns an empty dict when the metadata cannot be fetched.
+        """
+        self._load()
+        with self._lock:
+            entry = self._entries.get(symbol)
+
+        if entry is None:
+            try:
+                return metadata_executor.call(('info', symbol), self._refresh, symbol) or {}
+            except Exception as e:
+                print(f"Failed to fetch metadata for {symbol}: {str(e)}")
+                return {}
+
+        data, fetched_at = entry
+        if time.time() - fetched_at > self.ttl:
+            try:
+                self.refresh_async(symbol)
+            except Exception as e:
+                print(f"Failed to schedule metadata refresh for {symbol}: {str(e)}")
+        return data
+
+    def peek(self, symbol):
+        """
+        Return the cached metadata for the symbol (even if expired) without fetching, or None.
+        """
+        self._load()
+        with self._lock:
+            entry = self._entries.get(symbol)
+        return entry[0] if entry is not None else None
+
+    def warm_up(self, symbols):
+        """
+        Fetch metadata for every missing or expired symbol in the background.
+        Returns the futures of the scheduled refreshes so callers may wait for them.
+        """
+        self._load()
+        now = time.time()
+        futures = []
+        for symbol in dict.fromkeys(symbols):
+            with self._lock:
+                entry = self._entries.get(symbol)
+            if entry is None or now - entry[1] > self.ttl:
+                try:
+                    futures.append(self.refresh_async(symbol))
+                except Exception as e:
+                    print(f"Failed to schedule metadata refresh for {symbol}: {str(e)}")
+        return futures
+
+
+# Shared metadata cache used by the holdings and watchlist routes
+metadata_cache = MetadataCache()
+
+
+def get_metadata(symbol):
+    return metadata_cache.get(symbol)
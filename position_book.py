@@ -0,0 +1,218 @@
+# position_book.py
+
+import threading
+import time
+from collections import defaultdict
+
+from supabase_client import get_from_supabase
+from quote_cache import quote_cache, get_prices
+from identity import portfolio_ids
+from config import POSITION_BOOK_TTL
+
+
+class PositionBook:
+    """
+    Process-local book of portfolios (cash and holdings) with an incrementally maintained market value.
+    A portfolio is loaded from Supabase once, trades and deposits handled by this process are applied
+    as deltas, and every fresh quote re-marks only the portfolios holding that symbol (through the
+    symbol -> portfolios index). Entries are reloaded after `ttl` seconds to pick up changes made by
+    other processes.
+    """
+
+    def __init__(self, ttl=POSITION_BOOK_TTL):
+        self.ttl = ttl
+        self._portfolios = {}  # portfolio_id -> entry
+        self._by_user = {}  # user_id -> portfolio_id
+        self._by_symbol = defaultdict(set)  # symbol -> ids of portfolios holding it
+        self._marks = {}  # symbol -> price every holder is valued at
+        self._lock = threading.RLock()
+
+    # Loading
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry['loaded_at'] < self.ttl
+
+    def load(self, portfolio, stocks, stock_prices=None):
+        """
+        Replace the book entry of a portfolio with the given portfolios row and portfolio_stocks rows.
+        Held symbols missing from stock_prices are priced through the quote cache (so a reload picks
+        up prices older than its TTL), falling back to the current mark when a quote cannot be had;
+        the new marks also re-mark the other holders of each symbol.
+        An entry with a holding that still has no price is returned but not kept fresh in the book,
+        so an unpriced holding valued at 0 is never served from it.
+        """
+        held = [stock['stock_symbol'] for stock in stocks if stock.get('quantity', 0) > 0]
+        stock_prices = dict(stock_prices or {})
+        missing = [symbol for symbol in held if stock_prices.get(symbol) is None]
+        if missing:
+            stock_prices.update(get_prices(missing))
+
+        portfolio_id = portfolio['portfolio_id']
+        with self._lock:
+            for symbol in held:
+                if stock_prices.get(symbol) is None:
+                    stock_prices[symbol] = self._marks.get(symbol)
+            self._drop(portfolio_id)
+            for symbol in held:
+                if stock_prices.get(symbol) is not None:
+                    self._mark(symbol, stock_prices[symbol])
+
+            positions = {
+                stock['stock_symbol']: {
+                    'quantity': stock.get('quantity', 0) or 0,
+                    'average_price': stock.get('average_price')
+                }
+                for stock in stocks
+            }
+            entry = {
+                'portfolio_id': portfolio_id,
+                'user_id': portfolio.get('user_id'),
+                'cash_balance': portfolio.get('cash_balance', 0) or 0,
+                'positions': positions,
+                'stocks_value': 0.0,
+                'loaded_at': time.monotonic()
+            }
+            for symbol, position in positions.items():
+                if position['quantity'] > 0:
+                    self._by_symbol[symbol].add(portfolio_id)
+                    entry['stocks_value'] += position['quantity'] * (self._marks.get(symbol) or 0.0)
+            if any(self._marks.get(symbol) is None for symbol in held):
+                # Stale right away: the next read reloads and prices it again
+                entry['loaded_at'] -= self.ttl
+
+            self._portfolios[portfolio_id] = entry
+            if entry['user_id'] is not None:
+                self._by_user[entry['user_id']] = portfolio_id
+                portfolio_ids.set(entry['user_id'], portfolio_id)
+            return self._view(entry)
+
+    def _fetch(self, query):
+        """
+        Load a portfolio selected by a portfolios query. Returns (view, failed_response).
+        """
+        portfolio_response = get_from_supabase(query)
+        if portfolio_response.status_code != 200:
+            return None, portfolio_response
+        portfolios = portfolio_response.json()
+        if not portfolios:
+            return None, None
+
+        portfolio = portfolios[0]
+        stocks_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio['portfolio_id']}")
+        if stocks_response.status_code != 200:
+            return None, stocks_response
+        return self.load(portfolio, stocks_response.json()), None
+
+    def get(self, portfolio_id):
+        """
+        Return a view of the portfolio, loading it when it is missing or stale.
+        Returns (view, failed_response); view is None when the portfolio does not exist.
+        """
+        with self._lock:
+            entry = self._portfolios.get(portfolio_id)
+            if self._fresh(entry):
+                return self._view(entry), None
+        return self._fetch(f"portfolios?portfolio_id=eq.{portfolio_id}")
+
+    def get_for_user(self, user_id):
+        with self._lock:
+            entry = self._portfolios.get(self._by_user.get(user_id))
+            if self._fresh(entry):
+                return self._view(entry), None
+        portfolio_id = portfolio_ids.get(user_id)
+        if portfolio_id is not None:
+            return self.get(portfolio_id)
+        return self._fetch(f"portfolios?user_id=eq.{user_id}")
+
+    def invalidate(self, portfolio_id):
+        with self._lock:
+            self._drop(portfolio_id)
+
+    # Deltas
+
+    def apply_trade(self, portfolio_id, stock_symbol, new_quantity, average_price, new_cash_balance, price):
+        """
+        Apply an executed trade (the resulting position and cash balance) to a loaded portfolio.
+        The execution price marks the symbol when it has no mark yet (e.g. the first buy of it);
+        selling the last holding of a symbol in the book forgets its mark.
+        """
+        with self._lock:
+            entry = self._portfolios.get(portfolio_id)
+            if entry is None:
+                return
+
+            mark = self._marks.get(stock_symbol) or 0.0
+            position = entry['positions'].setdefault(stock_symbol, {'quantity': 0, 'average_price': average_price})
+            entry['stocks_value'] += (new_quantity - position['quantity']) * mark
+            position['quantity'] = new_quantity
+            position['average_price'] = average_price
+            entry['cash_balance'] = new_cash_balance
+
+            if new_quantity > 0:
+                self._by_symbol[stock_symbol].add(portfolio_id)
+                if self._marks.get(stock_symbol) is None and price is not None:
+                    self._mark(stock_symbol, price)
+            else:
+                self._release(stock_symbol, portfolio_id)
+
+    def apply_cash(self, portfolio_id, new_cash_balance):
+        with self._lock:
+            entry = self._portfolios.get(portfolio_id)
+            if entry is not None:
+                entry['cash_balance'] = new_cash_balance
+
+    def on_price(self, symbol, price):
+        """
+        Quote listener: re-mark every portfolio holding the symbol.
+        """
+        with self._lock:
+            if symbol in self._by_symbol:
+                self._mark(symbol, price)
+
+    def _mark(self, symbol, price):
+        delta = price - (self._marks.get(symbol) or 0.0)
+        self._marks[symbol] = price
+        if not delta:
+            return
+        for portfolio_id in self._by_symbol.get(symbol, ()):
+            entry = self._portfolios[portfolio_id]
+            entry['stocks_value'] += entry['positions'][symbol]['quantity'] * delta
+
+    def _drop(self, portfolio_id):
+        entry = self._portfolios.pop(portfolio_id, None)
+        if entry is None:
+            return
+        for symbol in entry['positions']:
+            self._release(symbol, portfolio_id)
+        if self._by_user.get(entry['user_id']) == portfolio_id:
+            del self._by_user[entry['user_id']]
+
+    def _release(self, symbol, portfolio_id):
+        """
+        Remove a portfolio from the holders of a symbol; the symbol's index entry and mark go with
+        its last holder, so quotes of symbols nobody holds any more are neither tracked nor served.
+        """
+        holders = self._by_symbol.get(symbol)
+        if holders is None:
+            return
+        holders.discard(portfolio_id)
+        if not holders:
+            del self._by_symbol[symbol]
+            self._marks.pop(symbol, None)
+
+    def _view(self, entry):
+        return {
+            'portfolio_id': entry['portfolio_id'],
+            'user_id': entry['user_id'],
+            'cash_balance': entry['cash_balance'],
+            'stocks_value': entry['stocks_value'],
+            'total_value': entry['cash_balance'] + entry['stocks_value'],
+            'positions': {
+                symbol: dict(position, price=self._marks.get(symbol))
+                for symbol, position in entry['positions'].items()
+            }
+        }
+
+
+position_book = PositionBook()
+quote_cache.subscribe(position_book.on_price)
@@ -0,0 +1,126 @@
+# price_poller.py
+
+import os
+import queue
+import threading
+from collections import Counter
+
+from quote_cache import quote_cache, download_prices
+from config import PRICE_STREAM_INTERVAL, PRICE_STREAM_BATCH, PRICE_STREAM_MAX_CLIENTS
+
+
+class Subscription:
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        # Only the latest prices matter, so a slow client gets one merged update instead of a backlog
+        self.updates = queue.Queue(maxsize=1)
+        self._lock = threading.Lock()
+
+    def push(self, prices):
+        with self._lock:
+            try:
+                pending = self.updates.get_nowait()
+            except queue.Empty:
+                pending = {}
+            pending.update(prices)
+            self.updates.put_nowait(pending)
+
+
+class PricePoller:
+    """
+    One background poller per process for all streaming clients. Every interval it downloads the
+    distinct subscribed symbols in batches, feeds the quote cache and pushes changed prices to the
+    subscribers of each symbol, so upstream load grows with distinct symbols, not with clients.
+    """
+
+    def __init__(self, interval=PRICE_STREAM_INTERVAL, batch_size=PRICE_STREAM_BATCH, max_clients=PRICE_STREAM_MAX_CLIENTS):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_clients = max_clients
+        self._subscriptions = set()
+        self._symbol_counts = Counter()
+        self._last_prices = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid = None
+
+    def _ensure_thread(self):
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid != os.getpid():
+                threading.Thread(target=self._run, name="price-poller", daemon=True).start()
+                self._started_pid = os.getpid()
+
+    def subscribe(self, symbols):
+        """
+        Register a client for the symbols. Returns None when the process already serves
+        max_clients streams: every stream holds a worker thread for its whole lifetime.
+        """
+        subscription = Subscription(symbols)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                return None
+            self._subscriptions.add(subscription)
+            self._symbol_counts.update(subscription.symbols)
+            known = {symbol: self._last_prices[symbol] for symbol in subscription.symbols if symbol in self._last_prices}
+        if known:
+            subscription.push(known)
+        self._ensure_thread()
+        # Poll right away so a new symbol does not wait a full interval
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+            self._symbol_counts.subtract(subscription.symbols)
+            for symbol in subscription.symbols:
+                if self._symbol_counts[symbol] <= 0:
+                    del self._symbol_counts[symbol]
+                    self._last_prices.pop(symbol, None)
+
+    def poll_once(self):
+        with self._lock:
+            symbols = sorted(self._symbol_counts)
+
+        changed = {}
+        for start in range(0, len(symbols), self.batch_size):
+            prices, failures = download_prices(symbols[start:start + self.batch_size])
+            for symbol, error in failures.items():
+                print(f"Price stream failed to fetch {symbol}: {error}")
+            for symbol, price in prices.items():
+                quote_cache.set(symbol, price)
+                if self._last_prices.get(symbol) != price:
+                    changed[symbol] = price
+
+        with self._lock:
+            # Symbols unsubscribed while downloading are not reported any more
+            changed = {symbol: price for symbol, price in changed.items() if symbol in self._symbol_counts}
+            self._last_prices.update(changed)
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            update = {symbol: changed[symbol] for symbol in subscription.symbols if symbol in changed}
+            if update:
+                subscription.push(update)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if not self._symbol_counts:
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Price stream poll failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscriptions), "symbols": len(self._symbol_counts)}
+
+
+price_poller = PricePoller()
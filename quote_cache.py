@@ -0,0 +1,98 @@
+# quote_cache.py
+
+from ttl_cache import TTLCache
+from config import QUOTE_CACHE_TTL, QUOTE_CACHE_MAX_SIZE
+from market_executor import market_executor
+from market_data import provider
+
+
+class QuoteCache(TTLCache):
+    """
+    Thread-safe LRU cache of the latest price per stock symbol that notifies listeners of every
+    fresh price. Every entry carries its own expiry time, so individual symbols can use a different TTL.
+    """
+
+    def __init__(self, ttl=QUOTE_CACHE_TTL, max_size=QUOTE_CACHE_MAX_SIZE):
+        super().__init__(ttl, max_size)
+        self._listeners = []
+
+    def set(self, symbol, price, ttl=None):
+        super().set(symbol, price, ttl)
+
+        # Listeners run outside the lock so they may read the cache themselves
+        for listener in self._listeners:
+            listener(symbol, price)
+
+    def subscribe(self, listener):
+        """
+        Call listener(symbol, price) whenever a fresh value is stored.
+        """
+        self._listeners.append(listener)
+
+
+# Shared cache used by every route and background job in this process
+quote_cache = QuoteCache()
+
+
+def get_price(symbol):
+    """
+    Return the latest closing price for the symbol, served from the quote cache when possible.
+    Returns None when the provider has no data for the symbol; network errors are propagated.
+    """
+    price = quote_cache.get(symbol)
+    if price is not None:
+        return price
+
+    # Concurrent misses for the same symbol share one upstream request
+    price = market_executor.call(('quote', symbol), provider.quote, symbol)
+    if price is not None:
+        quote_cache.set(symbol, price)
+    return price
+
+
+def download_prices(stock_symbols):
+    """
+    Fetch the latest closing prices for a list of symbols with a single batched provider request.
+    Returns a (prices, failures) tuple: symbol -> price for every symbol that returned data and
+    symbol -> error message for every symbol that did not.
+    """
+    symbols = list(dict.fromkeys(stock_symbols))
+    if not symbols:
+        return {}, {}
+
+    try:
+        return provider.quotes(symbols)
+    except Exception as e:
+        return {}, {symbol: str(e) for symbol in symbols}
+
+
+def get_prices(stock_symbols):
+    """
+    Return a symbol -> price mapping for the given symbols (None for symbols without data).
+    Cached symbols are served from the quote cache; all misses are fetched in one batch.
+    """
+    stock_prices = {}
+    missing = []
+    for symbol in dict.fromkeys(stock_symbols):
+        price = quote_cache.get(symbol)
+        stock_prices[symbol] = price
+        if price is None:
+            missing.append(symbol)
+
+    if missing:
+        prices, failures = download_prices(missing)
+        for symbol, price in prices.items():
+            quote_cache.set(symbol, price)
+            stock_prices[symbol] = price
+        for symbol, error in failures.items():
+            print(f"Failed to fetch stock price for {symbol}: {error}")
+
+    return stock_prices
+
+
+def remember_price(symbol, price):
+    """
+    Store a price obtained elsewhere (e.g. from a longer history download) so later lookups hit the cache.
+    """
+    if price is not None:
+        quote_cache.set(symbol, float(price))
@@ -0,0 +1,119 @@
+# quote_snapshots.py
+
+import time
+from concurrent.futures import wait
+
+from market_executor import market_executor, ExecutorSaturated
+from quote_cache import QuoteCache, remember_price
+from market_data import provider
+
+# Snapshots change as often as prices, so they share the quote TTL
+snapshot_cache = QuoteCache()
+
+
+def _snapshot(symbol, bars):
+    """
+    Build a snapshot from a symbol's daily bars (Close/High/Low columns), or None without data.
+    """
+    bars = bars.dropna(subset=['Close'])
+    if bars.empty:
+        return None
+
+    current_price = float(bars['Close'].iloc[-1])
+    previous_close = float(bars['Close'].iloc[-2]) if len(bars) > 1 else current_price
+    daily_return = (current_price - previous_close) / previous_close * 100 if previous_close else 0.0
+
+    return {
+        'stock_symbol': symbol,
+        'current_price': current_price,
+        'previous_close': previous_close,
+        'daily_return': round(daily_return, 2),
+        'day_low': float(bars['Low'].iloc[-1]),
+        'day_high': float(bars['High'].iloc[-1])
+    }
+
+
+def _remember(symbol, snapshot):
+    snapshot_cache.set(symbol, snapshot)
+    remember_price(symbol, snapshot['current_price'])
+    return snapshot
+
+
+def download_snapshots(stock_symbols):
+    """
+    Build snapshots for all symbols from one batched multi-day request and cache them, also when
+    the caller has stopped waiting, so a slow download still warms the cache for the next request.
+    Returns (snapshots, failures) like quote_cache.download_prices.
+    """
+    symbols = list(dict.fromkeys(stock_symbols))
+    try:
+        bars, failures = provider.daily_bars(symbols)
+    except Exception as e:
+        return {}, {symbol: str(e) for symbol in symbols}
+
+    snapshots = {}
+    for symbol, frame in bars.items():
+        snapshot = _snapshot(symbol, frame)
+        if snapshot is None:
+            failures[symbol] = "No price data returned"
+        else:
+            snapshots[symbol] = _remember(symbol, snapshot)
+    return snapshots, failures
+
+
+def _download_single(symbol):
+    snapshot = _snapshot(symbol, provider.history(symbol, period="5d", interval="1d"))
+    return _remember(symbol, snapshot) if snapshot is not None else None
+
+
+def get_quote_snapshots(stock_symbols, timeout=None):
+    """
+    Return symbol -> snapshot (last price, previous close, daily return, day high/low).
+    Cached snapshots are reused, the rest come from one batched download; symbols the batch could
+    not price are retried individually and concurrently. Symbols not ready within the timeout
+    (seconds, for the whole call) are left out of the result.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    snapshots = {}
+    missing = []
+    for symbol in dict.fromkeys(stock_symbols):
+        snapshot = snapshot_cache.get(symbol)
+        if snapshot is not None:
+            snapshots[symbol] = snapshot
+        else:
+            missing.append(symbol)
+
+    if not missing:
+        return snapshots
+
+    try:
+        batch = market_executor.call(('snapshots', tuple(sorted(missing))), download_snapshots, missing,
+                                     timeout=remaining())
+    except ExecutorSaturated as e:
+        print(f"Skipping quote snapshots for {missing}: {str(e)}")
+        return snapshots
+
+    if batch is None:
+        return snapshots
+    downloaded, failures = batch
+
+    # Fan out where batching did not work
+    futures = {}
+    for symbol in failures:
+        try:
+            futures[symbol] = market_executor.submit(('snapshot', symbol), _download_single, symbol)
+        except ExecutorSaturated:
+            break
+    wait(list(futures.values()), timeout=remaining())
+    for symbol, future in futures.items():
+        if future.done() and future.exception() is None and future.result() is not None:
+            downloaded[symbol] = future.result()
+        else:
+            print(f"Failed to fetch quote snapshot for {symbol}: {failures[symbol]}")
+
+    snapshots.update(downloaded)
+    return snapshots
@@ -0,0 +1,189 @@
+# revaluation.py
+
+import pandas as pd
+import requests
+from datetime import datetime
+
+from supabase_client import get_all_from_supabase, bulk_post_to_supabase, call_rpc
+from quote_cache import get_prices
+from config import REVALUATION_PAGE_SIZE, REVALUATION_PRICE_BATCH, SUPABASE_BULK_CHUNK_SIZE
+
+def load_portfolios():
+    rows, response = get_all_from_supabase("portfolios", {
+        "select": "portfolio_id,user_id,cash_balance,total_value",
+        "order": "portfolio_id.asc"
+    }, page_size=REVALUATION_PAGE_SIZE)
+    if rows is None:
+        print("Failed to fetch portfolios:", response.text)
+        return None
+
+    frame = pd.DataFrame(rows, columns=["portfolio_id", "user_id", "cash_balance", "total_value"])
+    frame["cash_balance"] = pd.to_numeric(frame["cash_balance"]).fillna(0.0)
+    frame["total_value"] = pd.to_numeric(frame["total_value"])
+    return frame
+
+def load_holdings():
+    # Only open positions matter for valuation, so closed ones are filtered out server-side
+    rows, response = get_all_from_supabase("portfolio_stocks", {
+        "select": "portfolio_id,stock_symbol,quantity",
+        "quantity": "gt.0",
+        "order": "portfolio_id.asc,stock_symbol.asc"
+    }, page_size=REVALUATION_PAGE_SIZE)
+    if rows is None:
+        print("Failed to fetch stocks:", response.text)
+        return None
+
+    frame = pd.DataFrame(rows, columns=["portfolio_id", "stock_symbol", "quantity"])
+    frame["quantity"] = pd.to_numeric(frame["quantity"])
+    return frame
+
+def price_symbols(stock_symbols):
+    """
+    Price every distinct symbol once, in batches of REVALUATION_PRICE_BATCH symbols.
+    """
+    stock_prices = {}
+    for start in range(0, len(stock_symbols), REVALUATION_PRICE_BATCH):
+        stock_prices.update(get_prices(stock_symbols[start:start + REVALUATION_PRICE_BATCH]))
+    return stock_prices
+
+def compute_totals(portfolios, holdings, stock_prices):
+    """
+    Compute the new total value of every portfolio in one vectorized pass.
+    Returns a frame indexed by portfolio_id with the stocks value, the new total and a 'priced'
+    flag that is False when any holding of the portfolio has no current price.
+    """
+    totals = portfolios.set_index("portfolio_id")
+
+    prices = holdings["stock_symbol"].map(stock_prices).astype(float)
+    values = holdings["quantity"] * prices
+    by_portfolio = holdings["portfolio_id"]
+
+    stocks_value = values.fillna(0.0).groupby(by_portfolio).sum()
+    unpriced = prices.isna().groupby(by_portfolio).any()
+
+    totals["stocks_value"] = stocks_value.reindex(totals.index, fill_value=0.0)
+    totals["priced"] = ~unpriced.reindex(totals.index, fill_value=False)
+    totals["new_total_value"] = totals["cash_balance"] + totals["stocks_value"]
+    return totals
+
+def aggregate_invested_values():
+    """
+    Return user_id -> invested value aggregated from the transactions themselves, for databases
+    without the user_ledger_totals table (requires PostgREST aggregate functions, like
+    ledger._aggregate_totals). One row per user and transaction type keeps the pages stable.
+    """
+    rows, response = get_all_from_supabase("transactions", {
+        "select": "user_id,transaction_type,amount.sum()",
+        "transaction_type": "in.(DEPOSIT,WITHDRAWAL)",
+        "order": "user_id.asc,transaction_type.asc"
+    }, page_size=REVALUATION_PAGE_SIZE)
+    if rows is None:
+        print("Failed to aggregate transactions:", response.text)
+        return None
+
+    frame = pd.DataFrame(rows, columns=["user_id", "transaction_type", "sum"])
+    amounts = pd.to_numeric(frame["sum"]).fillna(0.0)
+    signed = amounts.where(frame["transaction_type"] == "DEPOSIT", -amounts)
+    return signed.groupby(frame["user_id"]).sum()
+
+def load_invested_values():
+    """
+    Return a user_id -> invested value (deposits - withdrawals) series from the running ledger totals,
+    or aggregated from the transactions where that table is missing (sql/user_ledger_totals.sql).
+    """
+    rows, response = get_all_from_supabase("user_ledger_totals", {
+        "select": "user_id,total_deposits,total_withdrawals",
+        "order": "user_id.asc"
+    }, page_size=REVALUATION_PAGE_SIZE)
+    if rows is None:
+        print("Failed to fetch ledger totals, aggregating transactions instead:", response.text)
+        return aggregate_invested_values()
+
+    frame = pd.DataFrame(rows, columns=["user_id", "total_deposits", "total_withdrawals"])
+    invested = pd.to_numeric(frame["total_deposits"]).fillna(0.0) - pd.to_numeric(frame["total_withdrawals"]).fillna(0.0)
+    return pd.Series(invested.to_numpy(), index=frame["user_id"])
+
+def report_failures(table, failures):
+    for failure in failures:
+        print(f"Failed to write {failure['rows']} rows to {table} (offset {failure['offset']}, "
+              f"status {failure['status']}): {failure['error']}")
+    return sum(failure["rows"] for failure in failures)
+
+def write_totals(totals):
+    """
+    Update new total values in chunks with the update_portfolio_values function
+    (sql/update_portfolio_values.sql), which only changes existing portfolios; rows whose value
+    did not change (to the cent) are skipped. Returns (changed, failed) counts.
+    """
+    changed = totals[totals["new_total_value"].round(2) != totals["total_value"].round(2)]
+    portfolio_ids = changed.index.tolist()
+    total_values = changed["new_total_value"].astype(float).tolist()
+
+    failures = []
+    for start in range(0, len(portfolio_ids), SUPABASE_BULK_CHUNK_SIZE):
+        chunk = portfolio_ids[start:start + SUPABASE_BULK_CHUNK_SIZE]
+        try:
+            response = call_rpc("update_portfolio_values", {
+                "p_portfolio_ids": chunk,
+                "p_total_values": total_values[start:start + SUPABASE_BULK_CHUNK_SIZE]
+            })
+        except requests.exceptions.RequestException as e:
+            failures.append({"offset": start, "rows": len(chunk), "status": None, "error": str(e)})
+            continue
+
+        if response.status_code != 200:
+            failures.append({"offset": start, "rows": len(chunk), "status": response.status_code, "error": response.text})
+    return len(portfolio_ids), report_failures("portfolios", failures)
+
+def write_snapshots(totals, invested_values, created_at):
+    """
+    Insert one portfolio_returns snapshot per portfolio, in chunks. Returns (written, failed) counts.
+    """
+    invested = totals["user_id"].map(invested_values).fillna(0.0)
+    rows = [
+        {"portfolio_id": portfolio_id, "return_value": float(return_value),
+         "invested_value": float(invested_value), "created_at": created_at}
+        for portfolio_id, return_value, invested_value in zip(totals.index, totals["new_total_value"], invested)
+    ]
+    failures = bulk_post_to_supabase("portfolio_returns", rows)
+    return len(rows), report_failures("portfolio_returns", failures)
+
+def revalue_all_portfolios():
+    """
+    Revalue every portfolio: load all portfolios and open holdings, price the distinct symbols
+    across all portfolios once, compute the totals vectorized, upsert the changed ones and
+    insert a portfolio_returns snapshot for every portfolio.
+    """
+    portfolios = load_portfolios()
+    holdings = load_holdings() if portfolios is not None else None
+    invested_values = load_invested_values() if holdings is not None else None
+    if invested_values is None:
+        print("Revaluation aborted: input could not be loaded, no totals or snapshots were written")
+        return None
+
+    stock_symbols = holdings["stock_symbol"].drop_duplicates().tolist()
+    stock_prices = price_symbols(stock_symbols)
+
+    totals = compute_totals(portfolios, holdings, stock_prices)
+
+    # Never overwrite a value with one that silently treats an unpriced holding as worthless
+    skipped = int((~totals["priced"]).sum())
+    if skipped:
+        print(f"Skipping {skipped} portfolios with holdings that could not be priced")
+
+    priced = totals[totals["priced"]]
+    changed, failed = write_totals(priced)
+    snapshots, failed_snapshots = write_snapshots(priced, invested_values, datetime.utcnow().isoformat())
+
+    summary = {
+        "portfolios": len(totals),
+        "holdings": len(holdings),
+        "symbols": len(stock_symbols),
+        "changed": changed,
+        "failed": failed,
+        "snapshots": snapshots,
+        "failed_snapshots": failed_snapshots,
+        "skipped": skipped
+    }
+    print(f"Revaluation finished: {summary}")
+    return summary
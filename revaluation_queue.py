@@ -0,0 +1,102 @@
+# revaluation_queue.py
+
+import os
+import queue
+import threading
+
+from config import REVALUATION_QUEUE_WORKERS
+from update_single_portfolio import update_single_portfolio
+
+
+class RevaluationQueue:
+    """
+    Background queue that revalues portfolios off the request path.
+    Requests for a portfolio that is already waiting collapse into the waiting one; a request for a
+    portfolio that is being revalued right now schedules exactly one more run after it finishes,
+    so the final snapshot always reflects the latest trade.
+    """
+
+    def __init__(self, handler=update_single_portfolio, workers=REVALUATION_QUEUE_WORKERS):
+        self.handler = handler
+        self.workers = workers
+        self.enqueued = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._running = set()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+    def _ensure_workers(self):
+        # Worker threads do not survive a fork, every gunicorn worker starts its own
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"revaluation-{i}", daemon=True).start()
+            self._started_pid = os.getpid()
+
+    def enqueue(self, portfolio_id):
+        self._ensure_workers()
+        with self._lock:
+            if portfolio_id in self._pending:
+                self.coalesced += 1
+                return False
+            if portfolio_id in self._running:
+                self._dirty.add(portfolio_id)
+                self.coalesced += 1
+                return False
+            self._pending.add(portfolio_id)
+            self.enqueued += 1
+        self._queue.put(portfolio_id)
+        return True
+
+    def _work(self):
+        while True:
+            portfolio_id = self._queue.get()
+            with self._lock:
+                self._pending.discard(portfolio_id)
+                self._running.add(portfolio_id)
+            try:
+                self.handler(portfolio_id)
+            except Exception as e:
+                self.failed += 1
+                print(f"Background revaluation of portfolio {portfolio_id} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._running.discard(portfolio_id)
+                    rerun = portfolio_id in self._dirty
+                    if rerun:
+                        self._dirty.discard(portfolio_id)
+                        self._pending.add(portfolio_id)
+                        self.enqueued += 1
+                if rerun:
+                    self._queue.put(portfolio_id)
+                self._queue.task_done()
+
+    def join(self):
+        """
+        Block until every queued revaluation has been processed.
+        """
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "running": len(self._running),
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "failed": self.failed
+            }
+
+
+revaluation_queue = RevaluationQueue()
+
+
+def enqueue_revaluation(portfolio_id):
+    return revaluation_queue.enqueue(portfolio_id)
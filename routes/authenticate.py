@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 import requests
-from supabase_client import get_from_supabase, post_to_supabase
-from config import SUPABASE_URL, HEADERS
+from supabase_client import get_from_supabase, post_to_supabase, get_session, TIMEOUT
+from config import SUPABASE_URL
+from identity import remember_portfolio_id
+from instrumentation import track
 import logging
 
 # Set up logging
@@ -23,7 +25,8 @@ def authenticate():
 
         # Authenticate the user with Supabase
         auth_url = f"{SUPABASE_URL}/auth/v1/token?grant_type=password"
-        auth_response = requests.post(auth_url, json={"email": email, "password": password}, headers=HEADERS)
+        with track('supabase', 'auth/token'):
+            auth_response = get_session().post(auth_url, json={"email": email, "password": password}, timeout=TIMEOUT)
 
         # Check if authentication was successful
         if auth_response.status_code != 200:
@@ -77,6 +80,8 @@ def authenticate():
             portfolio_id = portfolios[0].get('portfolio_id')
             logging.debug(f"Existing portfolio ID: {portfolio_id}")
 
+        remember_portfolio_id(user_id, portfolio_id)
+
         # Return the user and portfolio information in the response
         return jsonify({
             "user_id": user_id,
@@ -105,7 +110,8 @@ def signup():
 
         # Zarejestruj użytkownika w Supabase
         signup_url = f"{SUPABASE_URL}/auth/v1/signup"
-        signup_response = requests.post(signup_url, json={"email": email, "password": password}, headers=HEADERS)
+        with track('supabase', 'auth/signup'):
+            signup_response = get_session().post(signup_url, json={"email": email, "password": password}, timeout=TIMEOUT)
 
         # Sprawdź, czy rejestracja się powiodła
         if signup_response.status_code != 200:
@@ -141,6 +147,7 @@ def signup():
 
         portfolio_id = portfolio_response.json()[0]['portfolio_id']
         logging.debug(f"Utworzono nowe portfolio o ID: {portfolio_id}")
+        remember_portfolio_id(user_id, portfolio_id)
 
         # Zwróć informacje o użytkowniku i portfolio w odpowiedzi
         return jsonify({
@@ -1,9 +1,9 @@
 from flask import Blueprint, request, jsonify
-from supabase_client import get_from_supabase, patch_to_supabase, post_to_supabase
-import yfinance as yf
+from quote_cache import get_price
+from trade_executor import execute_trade, TradeError
 import logging
-from update_returns import update_portfolio
-from update_single_portfolio import update_single_portfolio
+from revaluation_queue import enqueue_revaluation
+from position_book import position_book
 
 logger = logging.getLogger(__name__)
 
@@ -46,111 +46,28 @@ def buy_stock():
     logger.info(f"Przetwarzanie kupna: portfolio_id={portfolio_id}, stock_symbol={stock_symbol}, amount={amount}")
 
     try:
-        stock = yf.Ticker(stock_symbol)
-        stock_info = stock.history(period="1d")
-        if stock_info.empty:
+        current_price = get_price(stock_symbol)
+        if current_price is None:
             return jsonify({"error": "Nie udało się pobrać ceny akcji"}), 400
-        current_price = stock_info['Close'].iloc[0]
     except Exception as e:
         return jsonify({"error": f"Nie udało się pobrać ceny akcji: {str(e)}"}), 500
 
-    quantity_to_buy = amount / current_price
-
-    # Pobierz aktualny stan konta
-    portfolio_response = get_from_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}")
-    if portfolio_response.status_code != 200:
-        return jsonify({"error": "Nie udało się pobrać danych portfela"}), 500
-    
-    portfolio_data = portfolio_response.json()[0]
-    current_cash_balance = portfolio_data.get('cash_balance', 0)
-
-    if current_cash_balance < amount:
-        return jsonify({"error": "Niewystarczające środki na koncie"}), 400
-
-    new_cash_balance = current_cash_balance - amount
-
-    # Aktualizuj stan konta
-    response = patch_to_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}", {"cash_balance": new_cash_balance})
-    if response.status_code != 204:
-        return jsonify({"error": "Nie udało się zaktualizować stanu konta", "details": response.json()}), response.status_code
-
-    # Sprawdź, czy akcje już istnieją w portfelu
-    stock_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}&stock_symbol=eq.{stock_symbol}")
-    stock_data = stock_response.json()
-
-    if stock_data:
-        # Aktualizuj istniejące akcje
-        existing_stock = stock_data[0]
-        new_quantity = existing_stock['quantity'] + quantity_to_buy
-        new_total_investment = existing_stock['total_investment'] + amount
-        new_average_price = new_total_investment / new_quantity
-
-        response = patch_to_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}&stock_symbol=eq.{stock_symbol}", {
-            "quantity": new_quantity,
-            "total_investment": new_total_investment,
-            "average_price": new_average_price
-        })
-    else:
-        # Dodaj nowe akcje do portfela
-        response = post_to_supabase("portfolio_stocks", {
-            "portfolio_id": portfolio_id,
-            "stock_symbol": stock_symbol,
-            "quantity": quantity_to_buy,
-            "total_investment": amount,
-            "average_price": current_price
-        })
-
-    if response.status_code not in [200, 201, 204]:
-        return jsonify({"error": "Nie udało się zaktualizować stanu akcji", "details": response.json()}), response.status_code
-
-    # Zaktualizuj całkowitą wartość portfela
-    update_portfolio({"portfolio_id": portfolio_id}, [])
+    # Wykonaj zlecenie atomowo jednym wywołaniem funkcji w bazie danych
+    try:
+        result = execute_trade(portfolio_id, stock_symbol, "BUY", amount, current_price)
+    except TradeError as e:
+        logger.error(f"Zlecenie kupna odrzucone: {e.code} {e.details}")
+        return jsonify({"error": e.message, "details": e.details}), e.status
 
-    # Zarejestruj transakcję
-    trade_response = post_to_supabase("trades", {
-        "portfolio_id": portfolio_id,
-        "stock_symbol": stock_symbol,
-        "trade_type": "BUY",
-        "quantity": quantity_to_buy,
-        "price": current_price
-    })
-    if trade_response.status_code != 201:
-        return jsonify({"error": "Nie udało się zarejestrować transakcji", "details": trade_response.json()}), trade_response.status_code
+    position_book.apply_trade(portfolio_id, stock_symbol, result['new_quantity'], result['average_price'],
+                              result['new_cash_balance'], current_price)
 
-    # Aktualizuj wartość portfela
-    updated_value = update_single_portfolio(portfolio_id)
+    # Wycena portfela odbywa się w tle, odpowiedź nie czeka na ponowną wycenę
+    enqueue_revaluation(portfolio_id)
 
     return jsonify({
         "message": f"Kupiono akcje {stock_symbol} za ${amount:.2f}",
-        "quantity_bought": quantity_to_buy,
-        "new_cash_balance": new_cash_balance,
-        "updated_portfolio_value": updated_value
+        "quantity_bought": result['quantity'],
+        "new_quantity": result['new_quantity'],
+        "new_cash_balance": result['new_cash_balance']
     })
-
-def update_portfolio_total_value(portfolio_id):
-    """
-    Recalculate and update the portfolio's total value (cash balance + total stock investments).
-    """
-    # Fetch the portfolio data
-    portfolio_response = get_from_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}")
-    if portfolio_response.status_code != 200:
-        logging.error(f"Failed to fetch portfolio data for total value update.")
-        return
-
-    portfolio_data = portfolio_response.json()[0]
-    cash_balance = portfolio_data.get('cash_balance', 0)
-
-    # Fetch the total investment in stocks
-    stock_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}")
-    stocks = stock_response.json()
-
-    # Calculate total stock value, handling NoneType
-    total_stock_value = sum(stock.get('total_investment', 0) or 0 for stock in stocks if stock.get('quantity', 0) > 0)
-
-    # Calculate the total value (cash balance + total stock investments)
-    total_value = cash_balance + total_stock_value
-
-    # Update the portfolio with the new total value
-    patch_response = patch_to_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}", {"total_value": total_value})
-    if patch_response.status_code != 204:
-        logging.error(f"Failed to update portfolio total value.")
@@ -0,0 +1,204 @@
+# routes/dashboard.py
+
+import asyncio
+import time
+from concurrent.futures import wait
+from flask import Blueprint, request, jsonify
+from async_client import async_call, async_get_from_supabase, run_concurrently
+from ledger import get_ledger_totals
+from position_book import position_book
+from quote_snapshots import get_quote_snapshots
+from metadata_cache import metadata_cache
+from http_cache import conditional_get
+from identity import portfolio_ids, resolve_watchlist_id
+from config import USER_DATA_MAX_AGE, WATCHLIST_DEADLINE
+from routes.get_all_stocks import build_owned_stock
+from routes.get_invesment_chart_data import investment_series
+from routes.get_portfolio_history import aggregate_history, RESOLUTIONS
+from routes.watchlist import build_stock_data
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+SECTIONS = ('cash', 'stocks', 'investment', 'history', 'watchlist')
+
+async def nothing():
+    return None
+
+async def fetch_portfolio(user_id, with_history):
+    """
+    Resolve the user's portfolio and read its holdings and (optionally) its history. With the
+    portfolio_id already in the identity cache all three reads run together, otherwise the
+    holdings and history follow the portfolio lookup.
+    Returns (portfolio, stocks, history, failed_response).
+    """
+    def portfolio_reads(portfolio_id):
+        return (
+            async_get_from_supabase('portfolio_stocks', params={'portfolio_id': f'eq.{portfolio_id}'}),
+            async_get_from_supabase('portfolio_returns', params={
+                'portfolio_id': f'eq.{portfolio_id}',
+                'order': 'created_at.asc'
+            }) if with_history else nothing()
+        )
+
+    portfolio_id = portfolio_ids.get(user_id)
+    if portfolio_id is not None:
+        portfolio_response, stocks_response, history_response = await asyncio.gather(
+            async_get_from_supabase('portfolios', params={'portfolio_id': f'eq.{portfolio_id}'}),
+            *portfolio_reads(portfolio_id)
+        )
+    else:
+        portfolio_response = await async_get_from_supabase('portfolios', params={'user_id': f'eq.{user_id}'})
+        stocks_response = history_response = None
+
+    if portfolio_response.status_code != 200:
+        return None, None, None, portfolio_response
+
+    portfolios = portfolio_response.json()
+    if not portfolios:
+        return None, None, None, None
+
+    if portfolio_id is None:
+        stocks_response, history_response = await asyncio.gather(*portfolio_reads(portfolios[0]['portfolio_id']))
+
+    if stocks_response.status_code != 200:
+        return None, None, None, stocks_response
+    if history_response is not None and history_response.status_code != 200:
+        return None, None, None, history_response
+
+    history = history_response.json() if history_response is not None else None
+    return portfolios[0], stocks_response.json(), history, None
+
+async def fetch_watchlist(user_id):
+    """
+    Symbols on the user's watchlist. Returns (symbols, failed_response).
+    """
+    watchlist_id, watchlist_response = await async_call(resolve_watchlist_id, user_id)
+    if watchlist_response is not None:
+        return None, watchlist_response
+
+    if watchlist_id is None:
+        return [], None
+
+    stocks_response = await async_get_from_supabase('watchlist_stocks', params={
+        'watchlist_id': f'eq.{watchlist_id}',
+        'select': 'stock_symbol'
+    })
+    if stocks_response.status_code != 200:
+        return None, stocks_response
+    return [stock['stock_symbol'] for stock in stocks_response.json()], None
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@conditional_get(max_age=USER_DATA_MAX_AGE)
+def dashboard():
+    """
+    Everything the dashboard shows in one document: cash, stocks, investment, history and watchlist
+    (select a subset with ?fields=cash,stocks; history accepts ?resolution=hour/day/week).
+    The portfolio is resolved once, the Supabase reads run concurrently and all holdings and
+    watchlist symbols are priced with one batched quote download.
+    """
+    user_id = request.args.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    fields = request.args.get('fields')
+    sections = set(SECTIONS)
+    if fields:
+        sections = {field.strip() for field in fields.split(',') if field.strip()}
+        if not sections or not sections <= set(SECTIONS):
+            return jsonify({"error": f"Invalid fields, expected any of: {', '.join(SECTIONS)}"}), 400
+
+    resolution = request.args.get('resolution')
+    if resolution and resolution not in RESOLUTIONS:
+        return jsonify({'error': f"Invalid resolution, expected one of: {', '.join(RESOLUTIONS)}"}), 400
+
+    with_transactions = 'investment' in sections
+    # The cash section needs total_invested; it comes from the transactions when those are read anyway
+    with_ledger = 'cash' in sections and not with_transactions
+
+    (portfolio, stocks, history, failed_response), transactions_response, ledger, watchlist = run_concurrently(
+        fetch_portfolio(user_id, 'history' in sections),
+        async_get_from_supabase('transactions', params={
+            'select': 'transaction_type,amount,transaction_date',
+            'user_id': f'eq.{user_id}',
+            'transaction_type': 'in.(DEPOSIT,WITHDRAWAL)',
+            'order': 'transaction_date.asc'
+        }) if with_transactions else nothing(),
+        async_call(get_ledger_totals, user_id) if with_ledger else nothing(),
+        fetch_watchlist(user_id) if 'watchlist' in sections else nothing()
+    )
+
+    if failed_response is not None:
+        return jsonify({
+            "error": "Failed to fetch portfolio data",
+            "details": failed_response.json()
+        }), failed_response.status_code
+
+    if not portfolio:
+        return jsonify({"error": "Portfolio not found"}), 404
+
+    if transactions_response is not None and transactions_response.status_code != 200:
+        return jsonify({"error": "Failed to fetch transactions", "details": transactions_response.json()}), transactions_response.status_code
+
+    if ledger is not None and ledger[1] is not None:
+        return jsonify({"error": "Failed to fetch transactions", "details": ledger[1].json()}), ledger[1].status_code
+
+    watchlist_symbols = []
+    if watchlist is not None:
+        watchlist_symbols, watchlist_response = watchlist
+        if watchlist_response is not None:
+            return jsonify({"error": "Nie udało się pobrać watchlisty"}), 500
+
+    # One batched quote download for the union of holdings and watchlist symbols
+    held = []
+    if sections & {'cash', 'stocks'}:
+        held = [stock['stock_symbol'] for stock in stocks if (stock.get('quantity') or 0) > 0]
+    symbols = list(dict.fromkeys(held + watchlist_symbols))
+    deadline = time.monotonic() + WATCHLIST_DEADLINE
+    metadata_futures = metadata_cache.warm_up(symbols)
+    snapshots = get_quote_snapshots(symbols, timeout=WATCHLIST_DEADLINE) if symbols else {}
+    wait(metadata_futures, timeout=max(0.0, deadline - time.monotonic()))
+
+    # Only the cash and stocks sections need a valuation; load prices any holding the snapshots missed
+    view = None
+    if sections & {'cash', 'stocks'}:
+        view = position_book.load(portfolio, stocks, {
+            symbol: snapshot['current_price'] for symbol, snapshot in snapshots.items()
+        })
+
+    result = {"user_id": user_id, "portfolio_id": portfolio['portfolio_id']}
+
+    if 'investment' in sections:
+        result['investment_over_time'] = investment_series(transactions_response.json())
+
+    if 'cash' in sections:
+        if with_transactions:
+            total_invested = result['investment_over_time'][-1]['invested_amount'] if result['investment_over_time'] else 0
+        else:
+            total_invested = ledger[0]['total_invested']
+        result['cash'] = {
+            "cash_balance": view['cash_balance'],
+            "total_stocks_value": view['stocks_value'],
+            "total_portfolio_value": view['total_value'],
+            "total_invested": total_invested
+        }
+
+    if 'stocks' in sections:
+        result['owned_stocks'] = [
+            build_owned_stock(symbol, position, (metadata_cache.peek(symbol) or {}).get('shortName', symbol))
+            for symbol, position in view['positions'].items()
+        ]
+
+    if 'history' in sections:
+        if resolution and history:
+            history, _ = aggregate_history(history, RESOLUTIONS[resolution], False)
+        result['history'] = history
+
+    if 'watchlist' in sections:
+        result['watchlist'] = [
+            build_stock_data(snapshots[symbol], metadata_cache.peek(symbol) or {})
+            for symbol in watchlist_symbols
+            if symbol in snapshots
+        ]
+
+    return jsonify(result)
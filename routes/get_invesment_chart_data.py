@@ -1,84 +1,125 @@
 from flask import Blueprint, request, jsonify
+from async_client import async_call, async_get_from_supabase, run_concurrently
 from supabase_client import get_from_supabase
-import yfinance as yf
+from ledger import get_ledger_totals
+from http_cache import json_with_etag
+from identity import resolve_portfolio_id
 
 get_investment_chart_data_bp = Blueprint('get_investment_chart_data', __name__)
 
+# The cursor is "<transaction_date>|<transaction_id>" of the last point the client already has;
+# the id breaks ties between transactions with the same timestamp
+CURSOR_SEPARATOR = '|'
+
+async def no_baseline():
+    return None, None
+
+def after_cursor(since):
+    """
+    PostgREST filter for the transactions strictly after the cursor, in (transaction_date,
+    transaction_id) order. A cursor without an id (older clients) compares the date only.
+    """
+    since_date, _, since_id = since.partition(CURSOR_SEPARATOR)
+    if not since_id:
+        return 'transaction_date', f'gt.{since_date}'
+    return 'or', (f'(transaction_date.gt."{since_date}",'
+                  f'and(transaction_date.eq."{since_date}",transaction_id.gt."{since_id}"))')
+
 @get_investment_chart_data_bp.route('/get_investment_chart_data', methods=['GET'])
 def get_investment_chart_data():
     user_id = request.args.get('user_id')
+    since = request.args.get('since')  # Cursor returned by the previous response
 
     if not user_id:
         return jsonify({"error": "Missing user_id"}), 400
 
-    # Fetch portfolio based on user_id
-    portfolio_response = get_from_supabase(f"portfolios?user_id=eq.{user_id}")
-    if portfolio_response.status_code != 200:
+    transactions_params = {
+        'select': 'transaction_id,transaction_type,amount,transaction_date',
+        'user_id': f'eq.{user_id}',
+        'transaction_type': 'in.(DEPOSIT,WITHDRAWAL)',
+        'order': 'transaction_date.asc,transaction_id.asc'
+    }
+
+    if since:
+        column, condition = after_cursor(since)
+        transactions_params[column] = condition
+
+        # The baseline is the ledger total minus the transactions after the cursor, so both must
+        # describe the same ledger: read the totals first and only the transactions they include
+        (portfolio_id, portfolio_response), (ledger_totals, ledger_response) = run_concurrently(
+            async_call(resolve_portfolio_id, user_id),
+            async_call(get_ledger_totals, user_id)
+        )
+        if ledger_response is None:
+            # Transactions committed after the totals were read are left for the next request
+            last_transaction_date = ledger_totals['last_transaction_date']
+            if last_transaction_date is None:
+                transactions_params['limit'] = 0
+            else:
+                transactions_params['and'] = f'(transaction_date.lte."{last_transaction_date}")'
+        transactions_response = get_from_supabase('transactions', params=transactions_params)
+    else:
+        # Portfolio check (served by the identity cache after the first request) and all transactions, concurrently
+        (portfolio_id, portfolio_response), transactions_response, (ledger_totals, ledger_response) = run_concurrently(
+            async_call(resolve_portfolio_id, user_id),
+            async_get_from_supabase('transactions', params=transactions_params),
+            no_baseline()
+        )
+
+    if portfolio_response is not None:
         return jsonify({
             "error": "Failed to fetch portfolio data",
             "details": portfolio_response.json()
         }), portfolio_response.status_code
 
-    portfolio_data = portfolio_response.json()
-    if not portfolio_data:
+    if portfolio_id is None:
         return jsonify({"error": "Portfolio not found"}), 404
 
-    portfolio_id = portfolio_data[0].get('portfolio_id')
-
-    # Fetch transaction history (deposits and withdrawals) using user_id
-    transactions_response = get_from_supabase(f"transactions?user_id=eq.{user_id}")
     if transactions_response.status_code != 200:
         return jsonify({"error": "Failed to fetch transactions", "details": transactions_response.json()}), transactions_response.status_code
 
+    if ledger_response is not None:
+        return jsonify({"error": "Failed to fetch transactions", "details": ledger_response.json()}), ledger_response.status_code
+
     transactions = transactions_response.json()
 
-    # Accumulate deposits and withdrawals over time
-    cumulative_investment = 0
+    # The cumulative value before the cursor is the current total minus everything after it
+    baseline = 0
+    if since:
+        baseline = ledger_totals['total_invested'] - sum(signed_amount(transaction) for transaction in transactions)
+
+    investment_data = investment_series(transactions, baseline)
+
+    cursor = since
+    if transactions:
+        last = transactions[-1]
+        cursor = f"{last['transaction_date']}{CURSOR_SEPARATOR}{last['transaction_id']}"
+
+    return json_with_etag({
+        "user_id": user_id,
+        "investment_over_time": investment_data,
+        "cursor": cursor
+    })
+
+def signed_amount(transaction):
+    amount = transaction.get('amount', 0)
+    return amount if transaction.get('transaction_type') == 'DEPOSIT' else -amount
+
+def investment_series(transactions, baseline=0):
+    """
+    Cumulative invested amount after each deposit/withdrawal (ordered by transaction_date),
+    starting from the given baseline.
+    """
+    cumulative_investment = baseline
     investment_data = []
 
     for transaction in transactions:
-        transaction_type = transaction.get('transaction_type')
-        amount = transaction.get('amount', 0)
-        transaction_date = transaction.get('transaction_date')
-
-        # Adjust based on transaction type
-        if transaction_type == 'DEPOSIT':
-            cumulative_investment += amount
-        elif transaction_type == 'WITHDRAWAL':
-            cumulative_investment -= amount
+        cumulative_investment += signed_amount(transaction)
 
         # Append the data for charting
         investment_data.append({
-            "date": transaction_date,
+            "date": transaction.get('transaction_date'),
             "invested_amount": cumulative_investment
         })
 
-    # Fetch stocks in the portfolio
-    stocks_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}")
-    if stocks_response.status_code != 200:
-        return jsonify({"error": "Failed to fetch stocks", "details": stocks_response.json()}), stocks_response.status_code
-
-    stocks = stocks_response.json()
-    total_stocks_value = 0.0
-
-    # Fetch current prices for all stocks
-    stock_symbols = [stock['stock_symbol'] for stock in stocks if stock.get('quantity', 0) > 0]
-    if stock_symbols:
-        tickers = yf.Tickers(' '.join(stock_symbols))
-        for stock in stocks:
-            stock_symbol = stock.get('stock_symbol')
-            quantity = stock.get('quantity', 0)
-
-            try:
-                ticker = tickers.tickers[stock_symbol]
-                stock_info = ticker.history(period="1d")
-                current_price = stock_info['Close'].iloc[-1] if not stock_info.empty else None
-                if current_price:
-                    total_stocks_value += current_price * quantity
-            except Exception as e:
-                return jsonify({"error": f"Failed to fetch stock data for {stock_symbol}: {str(e)}"}), 500
-
-    return jsonify({
-        "user_id": user_id,
-        "investment_over_time": investment_data,
-    }), 200
+    return investment_data
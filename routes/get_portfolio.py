@@ -2,11 +2,13 @@
 
 from flask import Blueprint, request, jsonify
 from supabase_client import get_from_supabase
-from config import TEST_PORTFOLIO_ID
+from http_cache import conditional_get
+from config import TEST_PORTFOLIO_ID, USER_DATA_MAX_AGE
 
 get_portfolio_bp = Blueprint('get_portfolio', __name__)
 
 @get_portfolio_bp.route('/get_portfolio', methods=['GET'])
+@conditional_get(max_age=USER_DATA_MAX_AGE)
 def get_portfolio():
     portfolio_id = request.args.get('portfolio_id', TEST_PORTFOLIO_ID)
 
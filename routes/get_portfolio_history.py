@@ -1,21 +1,86 @@
+import re
+import pandas as pd
 from flask import Blueprint, request, jsonify
 from supabase_client import get_from_supabase
+from http_cache import json_with_etag, conditional_get
+from config import USER_DATA_MAX_AGE
 
 get_portfolio_history_bp = Blueprint('get_portfolio_history', __name__)
 
+MAX_PAGE_SIZE = 5000
+
+# The cursor is "<created_at>|<return_id>" of the last snapshot of the page; the id breaks ties
+# between snapshots inserted with the same timestamp (e.g. by the nightly bulk insert)
+CURSOR_SEPARATOR = '|'
+
+# Snapshot values are point-in-time, so a bucket is represented by its last snapshot.
+# Bucket widths are Timedeltas rather than frequency aliases, which were renamed across pandas versions
+WEEK = pd.Timedelta(weeks=1)
+RESOLUTIONS = {
+    'hour': pd.Timedelta(hours=1),
+    'day': pd.Timedelta(days=1),
+    'week': WEEK
+}
+
 @get_portfolio_history_bp.route('/get_portfolio_history', methods=['GET'])
+@conditional_get(max_age=USER_DATA_MAX_AGE)
 def get_portfolio_history():
+    """
+    Snapshots of the portfolio value, oldest first. Optional query parameters:
+    from / to (created_at range), fields (comma-separated columns), resolution (hour/day/week),
+    limit and after (keyset pagination; the next cursor is returned in the X-Next-Cursor header).
+    With a resolution every returned bucket is complete: a page cut inside its only bucket is
+    extended to that bucket's last snapshot.
+    """
     portfolio_id = request.args.get('portfolio_id')
 
     # Validate portfolio_id
     if not portfolio_id:
         return jsonify({'error': 'Missing portfolio_id'}), 400
 
-    # Prepare query parameters for Supabase
-    params = {
-        'portfolio_id': f'eq.{portfolio_id}',  # Filter based on portfolio_id
-        'order': 'created_at.asc'  # Sort by created_at in ascending order
-    }
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    after = request.args.get('after')
+    resolution = request.args.get('resolution')
+    fields = request.args.get('fields')
+    limit = request.args.get('limit')
+
+    if resolution and resolution not in RESOLUTIONS:
+        return jsonify({'error': f"Invalid resolution, expected one of: {', '.join(RESOLUTIONS)}"}), 400
+
+    columns = '*'
+    if fields:
+        columns = [column.strip() for column in fields.split(',') if column.strip()]
+        if not all(re.fullmatch(r'[a-z_]+', column) for column in columns):
+            return jsonify({'error': 'Invalid fields'}), 400
+        # created_at and return_id are needed for ordering, pagination and bucketing
+        for column in ('return_id', 'created_at'):
+            if column not in columns:
+                columns.insert(0, column)
+        columns = ','.join(columns)
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    # Prepare query parameters for Supabase (a list, so created_at can carry several filters)
+    params = [
+        ('select', columns),
+        ('portfolio_id', f'eq.{portfolio_id}'),  # Filter based on portfolio_id
+        ('order', 'created_at.asc,return_id.asc')  # Oldest first; return_id orders snapshots with the same timestamp
+    ]
+    if date_from:
+        params.append(('created_at', f'gte.{date_from}'))
+    if date_to:
+        params.append(('created_at', f'lte.{date_to}'))
+    if after:
+        params.append(after_cursor(after))
+    if limit:
+        params.append(('limit', limit))
 
     # Fetch historical data from portfolio_returns table
     response = get_from_supabase('portfolio_returns', params=params)
@@ -31,8 +96,75 @@ def get_portfolio_history():
         return jsonify({'error': 'Invalid JSON response from Supabase'}), 500
 
     # Check if data is empty and return a 404 if no records are found
-    if not data:
+    if not data and not (date_from or date_to or after):
         return jsonify({'error': 'No portfolio history found for the given portfolio_id'}), 404
 
+    page_full = limit is not None and len(data) == limit
+
+    if resolution and data:
+        last_row = data[-1]
+        data, open_bucket_end = aggregate_history(data, RESOLUTIONS[resolution], page_full)
+        if open_bucket_end is not None:
+            # The page ended inside its only bucket: fetch that bucket's last snapshot
+            close_params = [
+                ('select', columns),
+                ('portfolio_id', f'eq.{portfolio_id}'),
+                ('order', 'created_at.desc,return_id.desc'),
+                after_cursor(cursor_of(last_row)),
+                ('created_at', f'lt.{open_bucket_end}'),
+                ('limit', 1)
+            ]
+            if date_to:
+                close_params.append(('created_at', f'lte.{date_to}'))
+            close_response = get_from_supabase('portfolio_returns', params=close_params)
+            if close_response.status_code != 200:
+                return jsonify({'error': 'Failed to fetch portfolio history'}), close_response.status_code
+            data = close_response.json() or data
+
+    next_cursor = cursor_of(data[-1]) if page_full else None
+
     # Return the parsed data
-    return jsonify(data), 200
+    response = json_with_etag(data)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def cursor_of(row):
+    return f"{row['created_at']}{CURSOR_SEPARATOR}{row['return_id']}"
+
+def after_cursor(cursor):
+    """
+    PostgREST filter for the snapshots strictly after the cursor, in (created_at, return_id) order.
+    A cursor without an id (older clients) compares created_at only.
+    """
+    created_at, _, return_id = cursor.partition(CURSOR_SEPARATOR)
+    if not return_id:
+        return 'created_at', f'gt.{created_at}'
+    return 'or', f'(created_at.gt."{created_at}",and(created_at.eq."{created_at}",return_id.gt."{return_id}"))'
+
+def aggregate_history(rows, width, page_full):
+    """
+    Keep the last snapshot of every time bucket (width is one of RESOLUTIONS). When the page is full
+    its last bucket may continue on the next page, so it is left out and the page ends with the
+    bucket before it. A full page holding a single bucket cannot be shortened that way; it is
+    returned as-is with the end of that bucket, so the caller can fetch the bucket's last snapshot.
+    Returns (rows, open_bucket_end), open_bucket_end being None unless the single bucket is open.
+    """
+    frame = pd.DataFrame(rows)
+    # Timestamps are parsed one by one: Supabase omits zero fractional seconds, and vectorized
+    # parsing of such mixed ISO strings needs format='ISO8601', only available from pandas 2.0
+    created_at = pd.to_datetime(frame['created_at'].map(pd.Timestamp), utc=True)
+    if width == WEEK:
+        # Weeks start on Monday
+        buckets = created_at.dt.normalize() - pd.to_timedelta(created_at.dt.weekday, unit='D')
+    else:
+        buckets = created_at.dt.floor(width)
+
+    if page_full:
+        complete = buckets != buckets.iloc[-1]
+        if not complete.any():
+            return rows[-1:], (buckets.iloc[-1] + width).isoformat()
+        frame, buckets = frame[complete], buckets[complete]
+
+    last = frame.groupby(buckets.to_numpy(), sort=True).tail(1)
+    return last.to_dict(orient='records'), None
@@ -2,11 +2,13 @@
 
 from flask import Blueprint, request, jsonify
 from supabase_client import get_from_supabase
-from config import TEST_PORTFOLIO_ID
+from http_cache import conditional_get
+from config import TEST_PORTFOLIO_ID, USER_DATA_MAX_AGE
 
 get_stock_bp = Blueprint('get_stock', __name__)
 
 @get_stock_bp.route('/get_stock', methods=['GET'])
+@conditional_get(max_age=USER_DATA_MAX_AGE)
 def get_stock():
     portfolio_id = request.args.get('portfolio_id', TEST_PORTFOLIO_ID)
     stock_symbol = request.args.get('stock_symbol')
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-import yfinance as yf
+from quote_cache import get_price
+from http_cache import conditional_get
+from config import QUOTE_MAX_AGE
 import logging
 
 # Define the blueprint
@@ -7,6 +9,7 @@ stock_price_bp = Blueprint('stock_price', __name__)
 
 # Route for getting the current stock price
 @stock_price_bp.route('/get_stock_price', methods=['GET'])
+@conditional_get(max_age=QUOTE_MAX_AGE, public=True)
 def get_stock_price():
     # Get the stock symbol from query parameters
     stock_symbol = request.args.get('symbol')
@@ -15,17 +18,13 @@ def get_stock_price():
         return jsonify({"error": "Symbol akcji jest wymagany"}), 400
 
     try:
-        # Fetch stock information from yfinance
-        stock = yf.Ticker(stock_symbol)
-        stock_info = stock.history(period="1d")
-        
+        # Get the latest closing price (served from the shared quote cache when fresh)
+        current_price = get_price(stock_symbol)
+
         # Check if the stock data was retrieved successfully
-        if stock_info.empty:
+        if current_price is None:
             return jsonify({"error": "Nie udało się pobrać danych akcji"}), 400
         
-        # Get the latest closing price
-        current_price = stock_info['Close'].iloc[0]
-        
         return jsonify({
             "symbol": stock_symbol,
             "price": current_price
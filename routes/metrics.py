@@ -0,0 +1,28 @@
+# routes/metrics.py
+
+import os
+from flask import Blueprint, Response, jsonify
+
+try:
+    from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+except ImportError:  # prometheus_client is optional
+    generate_latest = None
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics: request durations per route and outbound call durations per upstream.
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) so every worker writes its
+    samples there and this endpoint, whichever worker serves it, reports the sum over all of them.
+    """
+    if generate_latest is None:
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,46 @@
+# routes/price_stream.py
+
+import json
+import queue
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from price_poller import price_poller
+from config import PRICE_STREAM_HEARTBEAT, PRICE_STREAM_MAX_SYMBOLS
+
+price_stream_bp = Blueprint('price_stream', __name__)
+
+@price_stream_bp.route('/stream_prices', methods=['GET'])
+def stream_prices():
+    """
+    Server-Sent Events stream of price updates for ?symbols=AAPL,MSFT.
+    Every event carries a {"symbol": price} object with the prices that changed since the last one.
+    """
+    symbols = [symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()]
+
+    if not symbols:
+        return jsonify({"error": "Symbol akcji jest wymagany"}), 400
+
+    if len(symbols) > PRICE_STREAM_MAX_SYMBOLS:
+        return jsonify({"error": f"Maksymalnie {PRICE_STREAM_MAX_SYMBOLS} symboli na połączenie"}), 400
+
+    subscription = price_poller.subscribe(symbols)
+    if subscription is None:
+        # The remaining worker threads are kept for the other API routes
+        return jsonify({"error": "Zbyt wiele otwartych strumieni cen, spróbuj ponownie później"}), 503, {'Retry-After': '30'}
+
+    def events():
+        try:
+            while True:
+                try:
+                    prices = subscription.updates.get(timeout=PRICE_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(prices)}\n\n"
+        finally:
+            price_poller.unsubscribe(subscription)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
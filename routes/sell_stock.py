@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from supabase_client import get_from_supabase, patch_to_supabase, post_to_supabase
-from config import TEST_PORTFOLIO_ID
-import yfinance as yf
+from quote_cache import get_price
+from trade_executor import execute_trade, TradeError
+from revaluation_queue import enqueue_revaluation
+from position_book import position_book
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,101 +50,28 @@ def sell_stock():
 
     # Pobierz aktualną cenę akcji
     try:
-        stock = yf.Ticker(stock_symbol)
-        stock_info = stock.history(period="1d")
-        if stock_info.empty:
+        current_price = get_price(stock_symbol)
+        if current_price is None:
             return jsonify({"error": "Nie udało się pobrać ceny akcji"}), 400
-        current_price = stock_info['Close'].iloc[0]
     except Exception as e:
         return jsonify({"error": f"Nie udało się pobrać ceny akcji: {str(e)}"}), 500
 
-    # Pobierz informacje o akcjach w portfelu
-    stock_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}&stock_symbol=eq.{stock_symbol}")
-    stock_data = stock_response.json()
-
-    if not stock_data:
-        return jsonify({"error": "Nie znaleziono akcji w portfelu"}), 400
-
-    stock_entry = stock_data[0]
-    current_quantity = stock_entry.get('quantity', 0)
-    current_value = current_quantity * current_price
-
-    if current_value < amount:
-        return jsonify({"error": "Niewystarczająca wartość akcji do sprzedaży"}), 400
-
-    quantity_to_sell = amount / current_price
-    remaining_quantity = current_quantity - quantity_to_sell
-
-    # Aktualizuj stan akcji w portfelu
-    if remaining_quantity > 0:
-        new_total_investment = remaining_quantity * stock_entry['average_price']
-        response = patch_to_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}&stock_symbol=eq.{stock_symbol}", {
-            "quantity": remaining_quantity,
-            "total_investment": new_total_investment
-        })
-    else:
-        # Ustaw ilość na 0 (miękkie usunięcie)
-        response = patch_to_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}&stock_symbol=eq.{stock_symbol}", {
-            "quantity": 0,
-            "total_investment": 0
-        })
-
-    if response.status_code != 204:
-        return jsonify({"error": "Nie udało się zaktualizować danych akcji", "details": response.json()}), response.status_code
-
-    # Dodaj kwotę sprzedaży do stanu konta portfela
-    portfolio_response = get_from_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}")
-    portfolio_data = portfolio_response.json()[0]
-    new_cash_balance = portfolio_data.get('cash_balance', 0) + amount
-
-    response = patch_to_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}", {"cash_balance": new_cash_balance})
-    if response.status_code != 204:
-        return jsonify({"error": "Nie udało się zaktualizować stanu konta", "details": response.json()}), response.status_code
+    # Wykonaj zlecenie atomowo jednym wywołaniem funkcji w bazie danych
+    try:
+        result = execute_trade(portfolio_id, stock_symbol, "SELL", amount, current_price)
+    except TradeError as e:
+        logger.error(f"Zlecenie sprzedaży odrzucone: {e.code} {e.details}")
+        return jsonify({"error": e.message, "details": e.details}), e.status
 
-    # Zaktualizuj całkowitą wartość portfela
-    update_portfolio_total_value(portfolio_id)
+    position_book.apply_trade(portfolio_id, stock_symbol, result['new_quantity'], result['average_price'],
+                              result['new_cash_balance'], current_price)
 
-    # Zarejestruj transakcję
-    trade_response = post_to_supabase("trades", {
-        "portfolio_id": portfolio_id,
-        "stock_symbol": stock_symbol,
-        "trade_type": "SELL",
-        "quantity": quantity_to_sell,
-        "price": current_price
-    })
-    if trade_response.status_code != 201:
-        return jsonify({"error": "Nie udało się zarejestrować transakcji", "details": trade_response.json()}), trade_response.status_code
+    # Wycena portfela odbywa się w tle, odpowiedź nie czeka na ponowną wycenę
+    enqueue_revaluation(portfolio_id)
 
     return jsonify({
         "message": f"Sprzedano akcje {stock_symbol} za ${amount:.2f}",
-        "quantity_sold": quantity_to_sell,
-        "new_cash_balance": new_cash_balance
+        "quantity_sold": result['quantity'],
+        "new_quantity": result['new_quantity'],
+        "new_cash_balance": result['new_cash_balance']
     })
-
-def update_portfolio_total_value(portfolio_id):
-    """
-    Recalculate and update the portfolio's total value (cash balance + total stock investments).
-    """
-    # Fetch the portfolio data
-    portfolio_response = get_from_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}")
-    if portfolio_response.status_code != 200:
-        logging.error(f"Failed to fetch portfolio data for total value update.")
-        return
-
-    portfolio_data = portfolio_response.json()[0]
-    cash_balance = portfolio_data.get('cash_balance', 0)
-
-    # Fetch the total investment in stocks
-    stock_response = get_from_supabase(f"portfolio_stocks?portfolio_id=eq.{portfolio_id}")
-    stocks = stock_response.json()
-
-    # Calculate total stock value, handling NoneType
-    total_stock_value = sum(stock.get('total_investment', 0) or 0 for stock in stocks if stock.get('quantity', 0) > 0)
-
-    # Calculate the total value (cash balance + total stock investments)
-    total_value = cash_balance + total_stock_value
-
-    # Update the portfolio with the new total value
-    patch_response = patch_to_supabase(f"portfolios?portfolio_id=eq.{portfolio_id}", {"total_value": total_value})
-    if patch_response.status_code != 204:
-        logging.error(f"Failed to update portfolio total value.")
\ No newline at end of file
@@ -1,70 +1,86 @@
 from flask import Blueprint, request, jsonify
-import yfinance as yf
-import threading
+import pandas as pd
+from market_executor import market_executor, ExecutorSaturated
+from candle_store import candle_store
+from downsampling import downsample
+from market_data import provider
+from http_cache import conditional_get
+from config import MARKET_DATA_MAX_AGE
+
+DEFAULT_MAX_POINTS = 1000
 
 get_historical_data_bp = Blueprint('get_historical_data', __name__)
 
 @get_historical_data_bp.route('/get_historical_data', methods=['GET'])
+@conditional_get(max_age=MARKET_DATA_MAX_AGE, public=True)
 def get_historical_data():
     stock_symbol = request.args.get('stock_symbol')
     timeframe = request.args.get('timeframe', '1mo')  # Default to 1 month if not provided
+    method = request.args.get('downsample', 'ohlc')  # 'ohlc' buckets or 'lttb' for line charts
 
     if not stock_symbol:
         return jsonify({"error": "Missing stock_symbol"}), 400
 
     try:
+        max_points = parse_max_points(request.args.get('max_points'))
         period, interval = map_timeframe(timeframe)
 
-        # Fetch historical data using yfinance with timeout
-        hist = fetch_yfinance_data(stock_symbol, period, interval)
+        # Serve bars from the local candle store; only bars newer than the stored ones are downloaded
+        hist = candle_store.get_history(
+            stock_symbol, period, interval,
+            fetch=lambda period=None, start=None: fetch_market_history(stock_symbol, period, interval, start=start)
+        )
 
         if hist is None:
             return jsonify({"error": "Request timed out."}), 504
         elif hist.empty:
             return jsonify({"error": f"No historical data available for {stock_symbol} with interval {interval}."}), 404
 
-        # Limit the number of data points to prevent excessive data
-        if len(hist) > 1000:
-            hist = hist.iloc[-1000:]
-
-        # Prepare data for JSON response
-        historical_prices = []
-        for date, row in hist.iterrows():
-            historical_prices.append({
-                "date": date.strftime('%Y-%m-%dT%H:%M:%S'),
-                "open": round(row['Open'], 2),
-                "high": round(row['High'], 2),
-                "low": round(row['Low'], 2),
-                "close": round(row['Close'], 2),
-                "volume": int(row['Volume'])
-            })
+        # Bound the payload by downsampling the whole range instead of dropping its beginning
+        hist = downsample(hist, max_points, method)
 
-        return jsonify({"historical_prices": historical_prices})
+        return jsonify({"historical_prices": serialize_history(hist)})
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except ExecutorSaturated:
+        return jsonify({"error": "Too many pending market data requests, try again later."}), 503
     except Exception as e:
         return jsonify({"error": f"Failed to fetch historical data for {stock_symbol}: {str(e)}"}), 500
 
-def fetch_yfinance_data(stock_symbol, period, interval, timeout=10):
-    result = {}
-    error = None
-
-    def target():
-        try:
-            ticker = yf.Ticker(stock_symbol)
-            result['hist'] = ticker.history(period=period, interval=interval)
-        except Exception as e:
-            result['error'] = str(e)
-
-    thread = threading.Thread(target=target)
-    thread.start()
-    thread.join(timeout)
-    if thread.is_alive():
-        return None  # Timeout occurred
-    if 'error' in result:
-        raise Exception(result['error'])
-    return result.get('hist')
+def parse_max_points(value):
+    if value is None:
+        return DEFAULT_MAX_POINTS
+    try:
+        max_points = int(value)
+    except ValueError:
+        raise ValueError("max_points must be an integer.")
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3.")
+    return max_points
+
+def serialize_history(hist):
+    """
+    Convert an OHLCV frame to a list of JSON-ready rows with column-wise operations.
+    """
+    prices = hist[['Open', 'High', 'Low', 'Close']].round(2)
+    frame = pd.DataFrame({
+        "date": hist.index.strftime('%Y-%m-%dT%H:%M:%S'),
+        "open": prices['Open'].to_numpy(),
+        "high": prices['High'].to_numpy(),
+        "low": prices['Low'].to_numpy(),
+        "close": prices['Close'].to_numpy(),
+        "volume": hist['Volume'].fillna(0).astype('int64').to_numpy()
+    })
+    return frame.to_dict(orient='records')
+
+def fetch_market_history(stock_symbol, period, interval, timeout=10, start=None):
+    # Identical concurrent requests share one download on the bounded market data pool
+    key = ('history', stock_symbol, period, interval, start)
+    return market_executor.call(key, download_history, stock_symbol, period, interval, start, timeout=timeout)
+
+def download_history(stock_symbol, period, interval, start=None):
+    return provider.history(stock_symbol, period=period, interval=interval, start=start)
 
 def map_timeframe(timeframe):
     timeframe_mapping = {
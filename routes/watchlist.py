@@ -1,46 +1,43 @@
 from flask import Blueprint, request, jsonify
 from supabase_client import get_from_supabase, post_to_supabase, delete_from_supabase
-import yfinance as yf
-from datetime import datetime, timedelta
+from concurrent.futures import wait
+import time
+from config import WATCHLIST_DEADLINE, USER_DATA_MAX_AGE
+from http_cache import conditional_get
+from identity import resolve_watchlist_id, remember_watchlist_id
+from quote_snapshots import get_quote_snapshots
+from metadata_cache import get_metadata, metadata_cache
 
 watchlist_bp = Blueprint('watchlist', __name__)
 
+def build_stock_data(snapshot, stock_info):
+    return {
+        'stock_symbol': snapshot['stock_symbol'],
+        'company_name': stock_info.get('shortName', snapshot['stock_symbol']),
+        'current_price': snapshot['current_price'],
+        'daily_return': snapshot['daily_return'],
+        'day_low': snapshot['day_low'],
+        'day_high': snapshot['day_high'],
+        'fifty_two_week_low': stock_info.get('fiftyTwoWeekLow'),
+        'fifty_two_week_high': stock_info.get('fiftyTwoWeekHigh')
+    }
+
 def get_stock_data(symbol):
     """
-    Funkcja pobierająca rozszerzone dane o akcjach za pomocą yfinance.
+    Funkcja pobierająca rozszerzone dane o akcjach (notowanie z cache lub od dostawcy danych rynkowych).
     """
     try:
-        ticker = yf.Ticker(symbol)
-        stock_info = ticker.info
-        
-        # Pobierz dane za ostatnie 2 dni
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=2)
-        history = ticker.history(start=start_date, end=end_date)
-        
-        if history.empty:
+        snapshot = get_quote_snapshots([symbol], timeout=WATCHLIST_DEADLINE).get(symbol)
+        if snapshot is None:
             print(f"Brak danych historycznych dla {symbol}")
             return None
-
-        current_price = history['Close'].iloc[-1]
-        previous_close = history['Close'].iloc[-2] if len(history) > 1 else current_price
-        daily_return = ((current_price - previous_close) / previous_close) * 100
-
-        return {
-            'stock_symbol': symbol,
-            'company_name': stock_info.get('shortName', symbol),
-            'current_price': current_price,
-            'daily_return': round(daily_return, 2),
-            'day_low': history['Low'].iloc[-1],
-            'day_high': history['High'].iloc[-1],
-            'fifty_two_week_low': stock_info.get('fiftyTwoWeekLow'),
-            'fifty_two_week_high': stock_info.get('fiftyTwoWeekHigh')
-        }
+        return build_stock_data(snapshot, get_metadata(symbol))
     except Exception as e:
         print(f"Błąd podczas pobierania danych dla {symbol}: {str(e)}")
         return None
 
 @watchlist_bp.route('/watchlist', methods=['GET'])
+@conditional_get(max_age=USER_DATA_MAX_AGE)
 def get_user_watchlist():
     user_id = request.args.get('user_id')
     if not user_id:
@@ -48,19 +45,15 @@ def get_user_watchlist():
 
     print(f"Pobieranie watchlisty dla użytkownika: {user_id}")
 
-    watchlist_response = get_from_supabase('watchlists', {'user_id': f'eq.{user_id}'})
-    if watchlist_response.status_code != 200:
+    watchlist_id, watchlist_response = resolve_watchlist_id(user_id)
+    if watchlist_response is not None:
         print(f"Błąd podczas pobierania watchlisty: {watchlist_response.status_code}, {watchlist_response.text}")
         return jsonify({"error": "Nie udało się pobrać watchlisty"}), 500
 
-    watchlists = watchlist_response.json()
-    print(f"Pobrane watchlisty: {watchlists}")
-
-    if not watchlists:
+    if watchlist_id is None:
         print("Użytkownik nie ma jeszcze watchlisty")
         return jsonify([]), 200
 
-    watchlist_id = watchlists[0]['watchlist_id']
     print(f"ID watchlisty: {watchlist_id}")
 
     stocks_response = get_from_supabase('watchlist_stocks', {'watchlist_id': f'eq.{watchlist_id}'})
@@ -71,13 +64,20 @@ def get_user_watchlist():
     watchlist_stocks = stocks_response.json()
     print(f"Pobrane akcje z watchlisty: {watchlist_stocks}")
     
+    # Notowania wszystkich akcji jednym zapytaniem, z limitem czasu na całą odpowiedź
+    deadline = time.monotonic() + WATCHLIST_DEADLINE
+    symbols = [stock['stock_symbol'] for stock in watchlist_stocks]
+    metadata_futures = metadata_cache.warm_up(symbols)
+    snapshots = get_quote_snapshots(symbols, timeout=WATCHLIST_DEADLINE)
+    wait(metadata_futures, timeout=max(0.0, deadline - time.monotonic()))
+
     updated_stocks = []
-    for stock in watchlist_stocks:
-        stock_data = get_stock_data(stock['stock_symbol'])
-        if stock_data:
-            updated_stocks.append(stock_data)
+    for symbol in symbols:
+        snapshot = snapshots.get(symbol)
+        if snapshot:
+            updated_stocks.append(build_stock_data(snapshot, metadata_cache.peek(symbol) or {}))
         else:
-            print(f"Nie udało się pobrać danych dla {stock['stock_symbol']}")
+            print(f"Nie udało się pobrać danych dla {symbol}")
 
     print(f"Zaktualizowane dane akcji: {updated_stocks}")
     return jsonify(updated_stocks), 200
@@ -99,13 +99,12 @@ def add_to_watchlist():
         return jsonify({"error": f"Nie udało się pobrać danych dla akcji {stock_symbol}"}), 400
 
     # Pobierz lub utwórz watchlistę dla użytkownika
-    watchlist_response = get_from_supabase('watchlists', {'user_id': f'eq.{user_id}'})
-    if watchlist_response.status_code != 200:
+    watchlist_id, watchlist_response = resolve_watchlist_id(user_id)
+    if watchlist_response is not None:
         print(f"Błąd podczas pobierania watchlisty: {watchlist_response.status_code}, {watchlist_response.text}")
         return jsonify({"error": "Nie udało się pobrać watchlisty"}), 500
 
-    watchlists = watchlist_response.json()
-    if not watchlists:
+    if watchlist_id is None:
         print("Tworzenie nowej watchlisty dla użytkownika")
         new_watchlist = {'user_id': user_id, 'watchlist_name': 'Default Watchlist'}
         watchlist_create_response = post_to_supabase('watchlists', new_watchlist)
@@ -119,8 +118,7 @@ def add_to_watchlist():
             print(f"Błąd podczas pobierania nowo utworzonej watchlisty: {watchlist_response.status_code}, {watchlist_response.text}")
             return jsonify({"error": "Nie udało się pobrać nowo utworzonej watchlisty"}), 500
         watchlist_id = watchlist_response.json()[0]['watchlist_id']
-    else:
-        watchlist_id = watchlists[0]['watchlist_id']
+        remember_watchlist_id(user_id, watchlist_id)
 
     print(f"ID watchlisty: {watchlist_id}")
 
@@ -158,12 +156,10 @@ def remove_from_watchlist():
         return jsonify({"error": "Brak wymaganych danych"}), 400
 
     # Pobierz watchlist_id dla użytkownika
-    watchlist_response = get_from_supabase('watchlists', {'user_id': f'eq.{user_id}'})
-    if watchlist_response.status_code != 200 or not watchlist_response.json():
+    watchlist_id, watchlist_response = resolve_watchlist_id(user_id)
+    if watchlist_response is not None or watchlist_id is None:
         return jsonify({"error": "Nie znaleziono watchlisty dla użytkownika"}), 404
 
-    watchlist_id = watchlist_response.json()[0]['watchlist_id']
-
     # Usuń akcję z listy obserwowanych
     response = delete_from_supabase('watchlist_stocks', {
         'watchlist_id': f'eq.{watchlist_id}',
@@ -0,0 +1,96 @@
+-- Executes a BUY or SELL order for `p_amount` dollars at `p_price` in one transaction.
+-- Called through PostgREST as POST /rest/v1/rpc/execute_trade.
+-- The portfolio row is locked, so concurrent orders on the same portfolio are serialized.
+-- Business errors are raised with SQLSTATE P0001 and one of these messages:
+-- PORTFOLIO_NOT_FOUND, INSUFFICIENT_FUNDS, STOCK_NOT_IN_PORTFOLIO, INSUFFICIENT_SHARES, INVALID_ORDER.
+
+CREATE OR REPLACE FUNCTION execute_trade(
+    p_portfolio_id portfolios.portfolio_id%TYPE,
+    p_stock_symbol TEXT,
+    p_trade_type TEXT,
+    p_amount NUMERIC,
+    p_price NUMERIC
+) RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cash NUMERIC;
+    v_quantity NUMERIC;
+    v_holding portfolio_stocks%ROWTYPE;
+    v_remaining NUMERIC;
+    v_average_price NUMERIC;
+BEGIN
+    IF p_amount IS NULL OR p_amount <= 0 OR p_price IS NULL OR p_price <= 0
+       OR p_trade_type NOT IN ('BUY', 'SELL') THEN
+        RAISE EXCEPTION 'INVALID_ORDER';
+    END IF;
+
+    SELECT cash_balance INTO v_cash FROM portfolios WHERE portfolio_id = p_portfolio_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'PORTFOLIO_NOT_FOUND';
+    END IF;
+    v_cash := COALESCE(v_cash, 0);
+    v_quantity := p_amount / p_price;
+
+    SELECT * INTO v_holding FROM portfolio_stocks
+    WHERE portfolio_id = p_portfolio_id AND stock_symbol = p_stock_symbol;
+
+    IF p_trade_type = 'BUY' THEN
+        IF v_cash < p_amount THEN
+            RAISE EXCEPTION 'INSUFFICIENT_FUNDS';
+        END IF;
+
+        IF v_holding.portfolio_id IS NOT NULL THEN
+            UPDATE portfolio_stocks
+            SET quantity = quantity + v_quantity,
+                total_investment = total_investment + p_amount,
+                average_price = (total_investment + p_amount) / (quantity + v_quantity)
+            WHERE portfolio_id = p_portfolio_id AND stock_symbol = p_stock_symbol
+            RETURNING quantity, average_price INTO v_remaining, v_average_price;
+        ELSE
+            INSERT INTO portfolio_stocks (portfolio_id, stock_symbol, quantity, total_investment, average_price)
+            VALUES (p_portfolio_id, p_stock_symbol, v_quantity, p_amount, p_price);
+            v_remaining := v_quantity;
+            v_average_price := p_price;
+        END IF;
+
+        v_cash := v_cash - p_amount;
+    ELSE
+        IF v_holding.portfolio_id IS NULL THEN
+            RAISE EXCEPTION 'STOCK_NOT_IN_PORTFOLIO';
+        END IF;
+        IF v_holding.quantity * p_price < p_amount THEN
+            RAISE EXCEPTION 'INSUFFICIENT_SHARES';
+        END IF;
+
+        v_remaining := v_holding.quantity - v_quantity;
+        v_average_price := v_holding.average_price;
+        IF v_remaining > 0 THEN
+            UPDATE portfolio_stocks
+            SET quantity = v_remaining,
+                total_investment = v_remaining * average_price
+            WHERE portfolio_id = p_portfolio_id AND stock_symbol = p_stock_symbol;
+        ELSE
+            -- Soft delete, the row is kept with zero quantity
+            v_remaining := 0;
+            UPDATE portfolio_stocks
+            SET quantity = 0, total_investment = 0
+            WHERE portfolio_id = p_portfolio_id AND stock_symbol = p_stock_symbol;
+        END IF;
+
+        v_cash := v_cash + p_amount;
+    END IF;
+
+    UPDATE portfolios SET cash_balance = v_cash WHERE portfolio_id = p_portfolio_id;
+
+    INSERT INTO trades (portfolio_id, stock_symbol, trade_type, quantity, price)
+    VALUES (p_portfolio_id, p_stock_symbol, p_trade_type, v_quantity, p_price);
+
+    RETURN json_build_object(
+        'quantity', v_quantity,
+        'new_cash_balance', v_cash,
+        'new_quantity', v_remaining,
+        'average_price', v_average_price
+    );
+END;
+$$;
@@ -0,0 +1,21 @@
+-- Sets total_value of many portfolios in one statement, for the nightly revaluation
+-- (revaluation.write_totals). Called through PostgREST as POST /rest/v1/rpc/update_portfolio_values
+-- with two arrays of equal length. Only existing rows are updated: unlike an upsert it needs no
+-- INSERT privilege and never recreates a portfolio deleted in the meantime.
+-- Returns the number of updated portfolios.
+
+CREATE OR REPLACE FUNCTION update_portfolio_values(
+    p_portfolio_ids UUID[],
+    p_total_values NUMERIC[]
+) RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE portfolios
+        SET total_value = new_values.total_value
+        FROM unnest(p_portfolio_ids, p_total_values) AS new_values (portfolio_id, total_value)
+        WHERE portfolios.portfolio_id = new_values.portfolio_id
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM updated;
+$$;
@@ -0,0 +1,70 @@
+-- Running per-user deposit/withdrawal totals, maintained by a trigger on every transactions insert,
+-- so reads of a user's invested value touch one small row instead of the whole ledger.
+-- Runs as one transaction: transactions are locked against inserts until the trigger exists and
+-- the backfill is done, so no deposit is counted twice or lost in between.
+
+BEGIN;
+
+LOCK TABLE transactions IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TABLE IF NOT EXISTS user_ledger_totals (
+    user_id UUID PRIMARY KEY,
+    total_deposits NUMERIC NOT NULL DEFAULT 0,
+    total_withdrawals NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    last_transaction_date TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION apply_transaction_to_ledger_totals() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.transaction_type NOT IN ('DEPOSIT', 'WITHDRAWAL') THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO user_ledger_totals AS totals
+        (user_id, total_deposits, total_withdrawals, transaction_count, last_transaction_date, updated_at)
+    VALUES (
+        NEW.user_id,
+        CASE WHEN NEW.transaction_type = 'DEPOSIT' THEN NEW.amount ELSE 0 END,
+        CASE WHEN NEW.transaction_type = 'WITHDRAWAL' THEN NEW.amount ELSE 0 END,
+        1,
+        NEW.transaction_date,
+        now()
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_deposits = totals.total_deposits + EXCLUDED.total_deposits,
+        total_withdrawals = totals.total_withdrawals + EXCLUDED.total_withdrawals,
+        transaction_count = totals.transaction_count + 1,
+        last_transaction_date = GREATEST(totals.last_transaction_date, EXCLUDED.last_transaction_date),
+        updated_at = now();
+
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS transactions_ledger_totals ON transactions;
+CREATE TRIGGER transactions_ledger_totals
+    AFTER INSERT ON transactions
+    FOR EACH ROW EXECUTE FUNCTION apply_transaction_to_ledger_totals();
+
+-- Backfill from the existing ledger; rerunning the script recomputes every user's totals
+INSERT INTO user_ledger_totals (user_id, total_deposits, total_withdrawals, transaction_count, last_transaction_date)
+SELECT user_id,
+       COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'DEPOSIT'), 0),
+       COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'WITHDRAWAL'), 0),
+       COUNT(*),
+       MAX(transaction_date)
+FROM transactions
+WHERE transaction_type IN ('DEPOSIT', 'WITHDRAWAL')
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_deposits = EXCLUDED.total_deposits,
+    total_withdrawals = EXCLUDED.total_withdrawals,
+    transaction_count = EXCLUDED.transaction_count,
+    last_transaction_date = EXCLUDED.last_transaction_date,
+    updated_at = now();
+
+COMMIT;
@@ -1,24 +1,138 @@
+import os
+import threading
 import requests
-from config import SUPABASE_URL, HEADERS
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (SUPABASE_URL, HEADERS, SUPABASE_POOL_SIZE, SUPABASE_CONNECT_TIMEOUT,
+                    SUPABASE_READ_TIMEOUT, SUPABASE_MAX_RETRIES, SUPABASE_RETRY_BACKOFF,
+                    SUPABASE_BULK_CHUNK_SIZE)
+from instrumentation import track
+
+TIMEOUT = (SUPABASE_CONNECT_TIMEOUT, SUPABASE_READ_TIMEOUT)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def _build_session():
+    # Only idempotent methods are retried after the request was sent; POST and PATCH are
+    # retried on connection errors only, when nothing reached the server yet.
+    retry = Retry(
+        total=SUPABASE_MAX_RETRIES,
+        backoff_factor=SUPABASE_RETRY_BACKOFF,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=SUPABASE_POOL_SIZE, pool_maxsize=SUPABASE_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """
+    Return the keep-alive session of the current process.
+    A forked gunicorn worker never reuses the sockets of its parent, it builds its own pool.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+def _table(endpoint):
+    # Calls are timed per table (or rpc/function), without the filters some endpoints carry inline
+    return endpoint.split('?', 1)[0]
 
 def get_from_supabase(endpoint, params=None):
     url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    response = requests.get(url, headers=HEADERS, params=params)
+    with track('supabase', _table(endpoint)):
+        response = get_session().get(url, params=params, timeout=TIMEOUT)
     return response
 
 def post_to_supabase(endpoint, data):
     url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    response = requests.post(url, headers=HEADERS, json=data)
+    with track('supabase', _table(endpoint)):
+        response = get_session().post(url, json=data, timeout=TIMEOUT)
     print(f"Odpowiedź z Supabase (status: {response.status_code}):")
     print(f"Treść: {response.text}")
     return response
 
+def call_rpc(function, args):
+    """
+    Call a Postgres function through PostgREST (POST /rest/v1/rpc/<function>) without logging the
+    arguments, which may be large arrays.
+    """
+    url = f"{SUPABASE_URL}/rest/v1/rpc/{function}"
+    with track('supabase', f"rpc/{function}"):
+        response = get_session().post(url, json=args, timeout=TIMEOUT)
+    return response
+
 def patch_to_supabase(endpoint, data):
     url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    response = requests.patch(url, headers=HEADERS, json=data)
+    with track('supabase', _table(endpoint)):
+        response = get_session().patch(url, json=data, timeout=TIMEOUT)
     return response
 
 def delete_from_supabase(endpoint, params=None):
     url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    response = requests.delete(url, headers=HEADERS, params=params)
+    with track('supabase', _table(endpoint)):
+        response = get_session().delete(url, params=params, timeout=TIMEOUT)
     return response
+
+def get_all_from_supabase(endpoint, params=None, page_size=1000):
+    """
+    Fetch every row matching the query, following PostgREST limit/offset pages.
+    params should contain an 'order' so that pages are stable. page_size must not exceed the
+    server's max-rows setting (1000 on Supabase), otherwise the first short page ends the scan.
+    Returns (rows, response); rows is None when one of the pages failed.
+    """
+    rows = []
+    offset = 0
+    while True:
+        page_params = dict(params or {}, limit=page_size, offset=offset)
+        response = get_from_supabase(endpoint, params=page_params)
+        if response.status_code != 200:
+            return None, response
+
+        page = response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows, response
+        offset += page_size
+
+def bulk_post_to_supabase(endpoint, rows, upsert=False, on_conflict=None, chunk_size=SUPABASE_BULK_CHUNK_SIZE):
+    """
+    Insert rows with array POSTs of at most chunk_size rows each.
+    With upsert=True rows colliding on the on_conflict column(s) are merged into the existing rows
+    (Prefer: resolution=merge-duplicates); only the columns present in the rows are updated.
+    All rows must have the same keys. Returns a list describing every chunk that failed.
+    """
+    url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
+    prefer = ["return=minimal"]
+    if upsert:
+        prefer.append("resolution=merge-duplicates")
+    headers = {"Prefer": ",".join(prefer)}
+    params = {"on_conflict": on_conflict} if on_conflict else None
+
+    failures = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            with track('supabase', _table(endpoint)):
+                response = get_session().post(url, json=chunk, headers=headers, params=params, timeout=TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            failures.append({"offset": start, "rows": len(chunk), "status": None, "error": str(e)})
+            continue
+
+        if response.status_code not in (200, 201, 204):
+            failures.append({"offset": start, "rows": len(chunk), "status": response.status_code, "error": response.text})
+
+    return failures
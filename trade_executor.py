@@ -0,0 +1,57 @@
+# trade_executor.py
+
+from supabase_client import post_to_supabase
+
+# Messages returned to the client for the errors raised by execute_trade (sql/execute_trade.sql)
+TRADE_ERRORS = {
+    'PORTFOLIO_NOT_FOUND': ("Nie znaleziono portfela", 404),
+    'INSUFFICIENT_FUNDS': ("Niewystarczające środki na koncie", 400),
+    'STOCK_NOT_IN_PORTFOLIO': ("Nie znaleziono akcji w portfelu", 400),
+    'INSUFFICIENT_SHARES': ("Niewystarczająca wartość akcji do sprzedaży", 400),
+    'INVALID_ORDER': ("Nieprawidłowe zlecenie", 400)
+}
+
+
+class TradeError(Exception):
+    def __init__(self, code, details=None):
+        message, status = TRADE_ERRORS.get(code, ("Nie udało się wykonać transakcji", 500))
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+class RpcTradeExecutor:
+    """
+    Executes each order atomically with a single call to the execute_trade Postgres function.
+    """
+
+    def execute(self, portfolio_id, stock_symbol, trade_type, amount, price):
+        """
+        Returns {'quantity', 'new_cash_balance', 'new_quantity', 'average_price'};
+        raises TradeError when the order is rejected.
+        """
+        response = post_to_supabase("rpc/execute_trade", {
+            "p_portfolio_id": portfolio_id,
+            "p_stock_symbol": stock_symbol,
+            "p_trade_type": trade_type,
+            "p_amount": amount,
+            "p_price": price
+        })
+        if response.status_code == 200:
+            return response.json()
+
+        try:
+            details = response.json()
+        except ValueError:
+            details = response.text
+        code = details.get('message') if isinstance(details, dict) else None
+        raise TradeError(code if code in TRADE_ERRORS else 'RPC_FAILED', details)
+
+
+trade_executor = RpcTradeExecutor()
+
+
+def execute_trade(portfolio_id, stock_symbol, trade_type, amount, price):
+    return trade_executor.execute(portfolio_id, stock_symbol, trade_type, amount, price)